@@ -0,0 +1,233 @@
+"""
+Offline stand-ins for the LLM and Tavily backends, with realistic latency distributions.
+
+Latencies are drawn from log-normal distributions parameterized by their median and
+p95, which matches the long-tailed shape of hosted LLM and search APIs. All values
+can be overridden through environment variables so the same stubs can be used from
+gunicorn workers started by the load-test driver.
+"""
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, get_origin
+
+from langchain_core.messages import AIMessage
+
+from src.core.state import Analyst, Perspectives, ResearchQuery
+from src.utils.helpers import format_search_results
+
+Z_95 = 1.6449
+
+
+class LatencyModel:
+    """
+    Log-normal latency distribution defined by its median and 95th percentile (in seconds).
+    """
+
+    def __init__(self, median: float, p95: float, scale: float = 1.0):
+        self.mu = math.log(median)
+        self.sigma = max(0.0, (math.log(p95) - self.mu) / Z_95)
+        self.scale = scale
+
+    def sample(self) -> float:
+        return self.scale * random.lognormvariate(self.mu, self.sigma)
+
+    def wait(self) -> float:
+        delay = self.sample()
+        time.sleep(delay)
+        return delay
+
+    @classmethod
+    def from_env(cls, prefix: str, median: float, p95: float) -> "LatencyModel":
+        """
+        Builds a model from <PREFIX>_MEDIAN / <PREFIX>_P95, scaled by LOADTEST_LATENCY_SCALE.
+        """
+        return cls(
+            float(os.environ.get(f"{prefix}_MEDIAN", median)),
+            float(os.environ.get(f"{prefix}_P95", p95)),
+            float(os.environ.get("LOADTEST_LATENCY_SCALE", 1.0)),
+        )
+
+
+class PrefixCache:
+    """
+    Simulates provider-side prompt caching: a prompt of at least `min_tokens` tokens reuses the
+    longest prefix, in `block_tokens` increments, seen in an earlier prompt. Tokens are
+    approximated as 4 characters.
+    """
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128, max_entries: int = 100000):
+        self.min_chars = min_tokens * 4
+        self.block_chars = block_tokens * 4
+        self.max_entries = max_entries
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup_and_store(self, prompt: str) -> int:
+        """Returns the number of cached prompt tokens and caches the prompt's prefixes."""
+        digest = hashlib.sha1()
+        boundaries = []
+        for end in range(self.block_chars, len(prompt) + 1, self.block_chars):
+            digest.update(prompt[end - self.block_chars:end].encode())
+            if end >= self.min_chars:
+                boundaries.append((end, digest.hexdigest()))
+        cached = 0
+        with self._lock:
+            for end, key in boundaries:
+                if key in self._prefixes:
+                    cached = end
+                    self._prefixes.move_to_end(key)
+                else:
+                    self._prefixes[key] = None
+            while len(self._prefixes) > self.max_entries:
+                self._prefixes.popitem(last=False)
+        return cached // 4
+
+
+def serialize_prompt(messages: List[Any]) -> str:
+    return "".join(f"<{m.type}>{m.content}" for m in messages)
+
+
+def usage_for(messages: List[Any], content: str, cache: PrefixCache) -> dict:
+    prompt = serialize_prompt(messages)
+    input_tokens = len(prompt) // 4
+    output_tokens = len(content) // 4
+    return {
+        "input_tokens": input_tokens, "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "input_token_details": {"cache_read": cache.lookup_and_store(prompt)},
+    }
+
+
+LOREM = (
+    "Revenue grew on higher volumes while margins stayed under pressure from costs [1]. "
+    "Analysts kept a neutral stance with price targets implying moderate upside [2]. "
+)
+
+
+class FakeStructuredModel:
+    """
+    Stand-in for `llm.with_structured_output(schema)`.
+    """
+
+    def __init__(self, schema, latency: LatencyModel, cache: PrefixCache, include_raw: bool = False):
+        self.schema = schema
+        self.latency = latency
+        self.cache = cache
+        self.include_raw = include_raw
+
+    def invoke(self, messages: List[Any], *args, **kwargs):
+        self.latency.wait()
+        parsed = self._parse(messages)
+        if not self.include_raw:
+            return parsed
+        raw = AIMessage(content="", usage_metadata=usage_for(messages, parsed.model_dump_json(), self.cache))
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+    def _parse(self, messages: List[Any]):
+        if self.schema is Perspectives:
+            # Current prompt ("Stocks: ..." in the last message) or the old one (benchmarks/legacy_prompts.py)
+            text = "\n".join(message.content for message in messages)
+            match = (re.search(r"^Stocks: (.*)$", text, re.MULTILINE)
+                     or re.search(r"each stock in: (.*?), for each analyst", text))
+            stocks = match.group(1).split(", ") if match else []
+            analysts = [
+                Analyst(affiliation="Banco Exemplo", name=f"Analyst {stock}", role="Equity Analyst",
+                        description=f"Covers {stock} fundamentals and valuation.")
+                for stock in stocks
+            ]
+            analysts.append(Analyst(affiliation="Instituto Global", name="Geo Analyst",
+                                    role="Geopolitical Analyst", description="Global risk factors."))
+            return Perspectives(analysts=analysts)
+        if self.schema is ResearchQuery:
+            return ResearchQuery(research_query=f"latest news {random.randint(0, 10**6)}")
+        # Any other schema: placeholder values for its fields
+        return self.schema.model_construct(**{
+            name: _placeholder(field.annotation) for name, field in self.schema.model_fields.items()
+        })
+
+
+def _placeholder(annotation) -> Any:
+    if annotation is str:
+        return LOREM.split(". ")[0]
+    if annotation in (int, float, bool):
+        return annotation()
+    if get_origin(annotation) in (list, List):
+        return []
+    return None
+
+
+class FakeChatModel:
+    """
+    Stand-in for the ChatOpenAI model used by the graph nodes.
+    """
+
+    def __init__(self, latency: LatencyModel = None, structured_latency: LatencyModel = None,
+                 output_words: int = 300, input_seconds_per_1k: float = None):
+        self.latency = latency or LatencyModel.from_env("LOADTEST_LLM", median=2.0, p95=6.0)
+        self.structured_latency = structured_latency or LatencyModel.from_env(
+            "LOADTEST_STRUCTURED", median=1.0, p95=3.0)
+        self.output_words = output_words
+        # Prompt processing time, so that longer prompts are slower
+        if input_seconds_per_1k is None:
+            input_seconds_per_1k = float(os.environ.get("LOADTEST_LLM_SECONDS_PER_1K_INPUT", 0.0)) * \
+                float(os.environ.get("LOADTEST_LATENCY_SCALE", 1.0))
+        self.input_seconds_per_1k = input_seconds_per_1k
+        self.prefix_cache = PrefixCache()
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs) -> FakeStructuredModel:
+        return FakeStructuredModel(schema, self.structured_latency, self.prefix_cache, include_raw)
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        self.latency.wait()
+        repeats = max(1, self.output_words // len(LOREM.split()))
+        content = (
+            f"## Section {random.randint(0, 10**6)}\n### Summary\n{LOREM * repeats}\n\n"
+            f"### Sources\n[1] https://example.com/news/{random.randint(0, 50)}\n"
+            f"[2] https://example.com/research/{random.randint(0, 50)}\n"
+        )
+        usage = usage_for(messages, content, self.prefix_cache)
+        # Cached prompt tokens skip prompt processing
+        uncached = usage["input_tokens"] - usage["input_token_details"]["cache_read"]
+        time.sleep(self.input_seconds_per_1k * uncached / 1000)
+        return AIMessage(content=content, usage_metadata=usage)
+
+
+class FakeSearchEngine:
+    """
+    Stand-in for `SearchEngine`, returning formatted documents after a simulated delay.
+    """
+
+    def __init__(self, latency: LatencyModel = None, max_results: int = 3, document_words: int = 400):
+        self.latency = latency or LatencyModel.from_env("LOADTEST_SEARCH", median=1.2, p95=4.0)
+        self.max_results = max_results
+        self.document_words = document_words
+
+    def cached(self, query: str):
+        return None
+
+    def search(self, query: str) -> str:
+        self.latency.wait()
+        body = " ".join(["market"] * self.document_words)
+        results = [
+            {"url": f"https://example.com/doc/{random.randint(0, 200)}", "content": body}
+            for _ in range(self.max_results)
+        ]
+        return format_search_results(results, query)
+
+
+def install(llm: FakeChatModel = None, search_engine: FakeSearchEngine = None) -> None:
+    """
+    Replaces the backends used by the graph nodes with offline stubs.
+    """
+    import src.core.nodes as nodes
+
+    nodes.llm = llm or FakeChatModel()
+    nodes.search_engine = search_engine or FakeSearchEngine()
+    # Never send traces of synthetic runs to an external service
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
@@ -0,0 +1,99 @@
+"""
+Simulation of multi-tenant scheduling against offline LLM/search backends.
+
+One tenant submits a large portfolio (batch) while other tenants keep submitting small
+interactive requests. The same workload runs twice over a shared LLM/search budget:
+- fifo: every call waits in a single queue, in arrival order
+- fair: per-tenant queues with weighted fair sharing and interactive priority
+
+Usage (from the repository root):
+    python -m benchmarks.fairshare --portfolio 40 --users 3 --capacity 8 --latency-scale 0.05
+"""
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("TRACE_EXPORTER", "off")
+
+from benchmarks.backends import FakeChatModel, FakeSearchEngine, LatencyModel, install
+from benchmarks.loadtest import percentile
+from src.core.scheduling import DEFAULT_TENANT, INTERACTIVE, FairShareLimiter, TenantScheduler
+
+TICKERS = ["PETR4", "VALE3", "ITUB4", "BBDC4", "ABEV3", "WEGE3", "B3SA3", "BBAS3"]
+
+
+class FifoScheduler(TenantScheduler):
+    """Baseline: all runs share one queue, so calls are served in arrival order."""
+
+    def classify(self, run_id):
+        return DEFAULT_TENANT, INTERACTIVE
+
+
+def run_workload(scheduler: TenantScheduler, portfolio: int, users: int) -> dict:
+    import src.app.main as main
+    import src.core.nodes as nodes
+
+    main.scheduler = nodes.scheduler = scheduler
+    interactive, batch = [], []
+    done = threading.Event()
+
+    def portfolio_job():
+        stocks = [f"T{i:03d}" for i in range(portfolio)]
+        started = time.perf_counter()
+        main.run_stock_research(stocks, deadline_seconds=None, tenant="portfolio")
+        batch.append(time.perf_counter() - started)
+        done.set()
+
+    def user_job(index: int):
+        # Give the portfolio run time to flood the budget first
+        time.sleep(1.0)
+        stocks = TICKERS[index % len(TICKERS):][:2] or TICKERS[:2]
+        while not done.is_set():
+            started = time.perf_counter()
+            main.run_stock_research(stocks, deadline_seconds=None, tenant=f"user{index}")
+            interactive.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=portfolio_job)]
+    threads += [threading.Thread(target=user_job, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "interactive_runs": len(interactive),
+        "interactive_p50": percentile(interactive, 50),
+        "interactive_p95": percentile(interactive, 95),
+        "batch_seconds": batch[0] if batch else None,
+        "llm": scheduler.llm_limiter.stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--portfolio", type=int, default=40, help="Tickers in the batch request")
+    parser.add_argument("--users", type=int, default=3, help="Tenants sending interactive requests")
+    parser.add_argument("--capacity", type=int, default=8, help="LLM calls in flight at once")
+    parser.add_argument("--search-capacity", type=int, default=4, help="Searches in flight at once")
+    parser.add_argument("--latency-scale", type=float, default=0.05)
+    args = parser.parse_args()
+
+    scale = args.latency_scale
+    install(FakeChatModel(LatencyModel(2.0, 6.0, scale), LatencyModel(1.0, 3.0, scale)),
+            FakeSearchEngine(LatencyModel(1.2, 4.0, scale)))
+
+    print(f"{'mode':>5} | {'interactive runs':>16} {'p50 s':>7} {'p95 s':>7} | {'batch s':>8} | "
+          f"{'mean wait s (interactive/batch)':>31}")
+    for mode, cls in (("fifo", FifoScheduler), ("fair", TenantScheduler)):
+        scheduler = cls(FairShareLimiter(args.capacity), FairShareLimiter(args.search_capacity))
+        result = run_workload(scheduler, args.portfolio, args.users)
+        waits = result["llm"]["mean_wait_seconds"]
+        print(f"{mode:>5} | {result['interactive_runs']:>16} {result['interactive_p50']:>7.2f} "
+              f"{result['interactive_p95']:>7.2f} | {result['batch_seconds']:>8.2f} | "
+              f"{waits['interactive']:>15.3f} / {waits['batch']:<13.3f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Gunicorn configuration used by the load-test driver: swaps in the offline backends in every worker.
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+
+
+def post_worker_init(worker):
+    from benchmarks.backends import install
+
+    install()
+    worker.log.info("Offline LLM/search backends installed")
@@ -0,0 +1,69 @@
+"""
+Benchmark of hedged LLM and search calls against heavy-tailed offline backends.
+
+Runs the same sequence of research runs without and with hedging on every node, and
+reports end-to-end run latency together with the hedger's per-node hedge rate and p99.
+
+Usage (from the repository root):
+    python -m benchmarks.hedging --runs 40 --latency-scale 0.02
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("TRACE_EXPORTER", "off")
+
+from benchmarks.backends import FakeChatModel, FakeSearchEngine, LatencyModel, install
+from benchmarks.loadtest import percentile
+from src.utils.hedging import Hedger
+
+NODES = ["create_analysts", "generate_question", "web_search", "generate_answer", "write_section",
+         "write_report", "write_introduction", "write_conclusion", "search"]
+
+
+def run_sequence(hedger: Hedger, runs: int, stocks) -> list:
+    import src.app.main as main
+    import src.core.nodes as nodes
+
+    nodes.hedger = hedger
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        main.run_stock_research(stocks, deadline_seconds=None)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--stocks", nargs="+", default=["PETR4", "VALE3", "ITUB4"])
+    parser.add_argument("--latency-scale", type=float, default=0.02)
+    parser.add_argument("--llm-p95", type=float, default=10.0, help="Unscaled LLM p95 (median 2s)")
+    parser.add_argument("--max-ratio", type=float, default=0.1)
+    parser.add_argument("--percentile", type=float, default=95)
+    args = parser.parse_args()
+
+    scale = args.latency_scale
+    install(FakeChatModel(LatencyModel(2.0, args.llm_p95, scale), LatencyModel(1.0, args.llm_p95 / 2, scale)),
+            FakeSearchEngine(LatencyModel(1.2, 6.0, scale)))
+
+    print(f"{'mode':>8} | {'run p50 s':>9} {'run p95 s':>9} {'run p99 s':>9}")
+    for mode, enabled in (("unhedged", []), ("hedged", NODES)):
+        hedger = Hedger(enabled, percentile=args.percentile, max_ratio=args.max_ratio)
+        durations = run_sequence(hedger, args.runs, args.stocks)
+        print(f"{mode:>8} | {percentile(durations, 50):>9.2f} {percentile(durations, 95):>9.2f} "
+              f"{percentile(durations, 99):>9.2f}", flush=True)
+        if enabled:
+            stats = hedger.stats()
+            print(f"\nhedged {stats['hedged']} of {stats['calls']} calls")
+            print(f"{'node':>20} | {'calls':>6} {'hedge %':>8} {'wins':>5} | {'p99 unhedged':>12} {'p99':>7}")
+            for key, s in stats["keys"].items():
+                print(f"{key:>20} | {s['calls']:>6} {s['hedge_rate']:>8.1%} {s['hedge_wins']:>5} | "
+                      f"{s['p99_unhedged_seconds'] or 0:>12.3f} {s['p99_seconds'] or 0:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
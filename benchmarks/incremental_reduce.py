@@ -0,0 +1,126 @@
+"""
+Benchmark of the incremental reduce of report sections on large portfolios.
+
+Runs the same portfolio with the final writers reading every section (off) and with
+sections merged into a digest while interviews finish (on). Reports the total run time,
+the time left after the last section is written (the final stage's critical path) and
+the largest final-writer prompt.
+
+Usage (from the repository root):
+    python -m benchmarks.incremental_reduce --tickers 20 --runs 3 --latency-scale 0.05
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("TRACE_EXPORTER", "off")
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.backends import FakeChatModel, FakeSearchEngine, LatencyModel, install
+
+WRITERS = ("write_report", "write_introduction", "write_conclusion")
+
+
+class StageTimer:
+    """When the last section was written and the report finalized, and the largest writer prompt."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_section = 0.0
+        self.finalized = 0.0
+        self.writer_tokens = 0
+
+
+class StageTracker(BaseCallbackHandler):
+    """Callback handler recording when sections are written and the report is finalized."""
+
+    def __init__(self, timer: StageTimer):
+        self.timer = timer
+        self.nodes: Dict[UUID, str] = {}
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self.nodes[run_id] = node
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        node = self.nodes.pop(run_id, None)
+        with self.timer.lock:
+            if node == "write_section":
+                self.timer.last_section = max(self.timer.last_section, time.perf_counter())
+            elif node == "finalize_report":
+                self.timer.finalized = time.perf_counter()
+
+
+class TimedTracer:
+    """Stands in for the app's tracer, handing every run the stage tracker."""
+
+    def __init__(self):
+        self.timer = None
+
+    def callbacks_for_run(self, trace_id: str) -> list:
+        self.timer = StageTimer()
+        return [StageTracker(self.timer)]
+
+
+def record_writer_prompts(nodes, tracer: TimedTracer) -> None:
+    """Wraps the nodes' LLM helper to record the size of the final writers' prompts."""
+    invoke_llm = nodes.invoke_llm
+
+    def recording(state, node, model, messages):
+        if node in WRITERS:
+            tokens = sum(len(str(m.content)) for m in messages) // 4
+            with tracer.timer.lock:
+                tracer.timer.writer_tokens = max(tracer.timer.writer_tokens, tokens)
+        return invoke_llm(state, node, model, messages)
+
+    nodes.invoke_llm = recording
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-scale", type=float, default=0.05)
+    parser.add_argument("--seconds-per-1k-input", type=float, default=1.0,
+                        help="Unscaled prompt processing time per 1000 input tokens")
+    args = parser.parse_args()
+
+    scale = args.latency_scale
+    install(FakeChatModel(LatencyModel(2.0, 6.0, scale), LatencyModel(1.0, 3.0, scale),
+                          input_seconds_per_1k=args.seconds_per_1k_input * scale),
+            FakeSearchEngine(LatencyModel(1.2, 4.0, scale)))
+
+    import src.app.main as app_main
+    import src.core.nodes as nodes
+
+    tracer = TimedTracer()
+    app_main.tracer = tracer
+    record_writer_prompts(nodes, tracer)
+    stocks = [f"T{i:03d}" for i in range(args.tickers)]
+
+    print(f"{'mode':>4} | {'run s':>7} | {'after last section s':>20} | {'max writer prompt tokens':>24}")
+    for mode in ("off", "on"):
+        nodes.INCREMENTAL_REDUCE = mode == "on"
+        totals, tails, tokens = [], [], []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            app_main.run_stock_research(stocks, deadline_seconds=None)
+            totals.append(time.perf_counter() - started)
+            timer = tracer.timer
+            tails.append(timer.finalized - timer.last_section)
+            tokens.append(timer.writer_tokens)
+        print(f"{mode:>4} | {statistics.mean(totals):>7.2f} | {statistics.mean(tails):>20.2f} | "
+              f"{max(tokens):>24}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+HTTP load test for the Flask app against offline LLM/search backends.
+
+Starts `src.app.main:app` under gunicorn for each worker configuration, ramps the
+number of concurrent clients and reports throughput, latency percentiles, error
+rates and per-worker memory.
+
+Usage (from the repository root):
+    python -m benchmarks.loadtest --worker-class sync gthread --workers 1 2 \\
+        --concurrency 1 4 8 --stage-seconds 60 --latency-scale 0.2 --output results.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+TICKERS = ["PETR4", "VALE3", "ITUB4", "BBDC4", "ABEV3", "WEGE3", "B3SA3", "BBAS3"]
+DOWNLOAD_RE = re.compile(r'href="(/download/[^"]+)"')
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker_rss_mb(master_pid: int) -> List[float]:
+    """Returns the resident memory (MB) of each gunicorn worker, read from /proc."""
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            children = [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+    rss = []
+    for pid in children:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss.append(int(line.split()[1]) / 1024)
+        except OSError:
+            continue
+    return rss
+
+
+class Server:
+    """
+    A gunicorn process serving the app with offline backends.
+    """
+
+    def __init__(self, worker_class: str, workers: int, threads: int, latency_scale: float):
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        # Everything the app writes goes to a temporary directory, never to the repository's own
+        self.data_dir = tempfile.TemporaryDirectory(prefix="loadtest_")
+        env = dict(os.environ, PYTHONPATH=ROOT, LOADTEST_LATENCY_SCALE=str(latency_scale),
+                   REPORTS_DIR=os.path.join(self.data_dir.name, "reports"),
+                   TRACE_DIR=os.path.join(self.data_dir.name, "traces"),
+                   PROFILE_DIR=os.path.join(self.data_dir.name, "profiles"),
+                   PREWARM_DIR=os.path.join(self.data_dir.name, "sections"),
+                   TRACE_EXPORTER="off", PREWARM_WATCHLIST="")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "benchmarks", "gunicorn_conf.py"),
+             "-k", worker_class, "-w", str(workers), "--threads", str(threads), "--timeout", "800",
+             "--bind", f"127.0.0.1:{self.port}", "src.app.main:app"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            try:
+                urllib.request.urlopen(self.base_url + "/", timeout=2).read()
+                return
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.5)
+        raise RuntimeError("gunicorn did not become ready in time")
+
+    def stop(self) -> None:
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.data_dir.cleanup()
+
+
+class Stage:
+    """
+    Collects the results of one concurrency level.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {"post": [], "download": []}
+        self.errors: Dict[str, int] = {"post": 0, "download": 0}
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, latency: float, ok: bool) -> None:
+        with self.lock:
+            if ok:
+                self.latencies[kind].append(latency)
+            else:
+                self.errors[kind] += 1
+
+    def summary(self, seconds: float) -> Dict[str, Dict[str, Optional[float]]]:
+        result = {}
+        for kind, latencies in self.latencies.items():
+            total = len(latencies) + self.errors[kind]
+            result[kind] = {
+                "requests": total,
+                "throughput_rps": len(latencies) / seconds,
+                "error_rate": self.errors[kind] / total if total else 0.0,
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+            }
+        return result
+
+
+def post_report(base_url: str, tickers_per_request: int, timeout: float) -> Optional[str]:
+    """Requests a report and returns its download path, if the page links one."""
+    stocks = ", ".join(random.sample(TICKERS, tickers_per_request))
+    data = urllib.parse.urlencode({"stocks": stocks}).encode()
+    with urllib.request.urlopen(base_url + "/", data=data, timeout=timeout) as response:
+        match = DOWNLOAD_RE.search(response.read().decode("utf-8", "replace"))
+    return match.group(1) if match else None
+
+
+def client(base_url: str, stage: Stage, stop: threading.Event, downloads: List[str],
+           post_ratio: float, tickers_per_request: int, timeout: float) -> None:
+    while not stop.is_set():
+        kind = "post" if random.random() < post_ratio or not downloads else "download"
+        started = time.perf_counter()
+        try:
+            if kind == "post":
+                path = post_report(base_url, tickers_per_request, timeout)
+                ok = path is not None
+                if ok:
+                    downloads.append(path)
+            else:
+                with urllib.request.urlopen(base_url + random.choice(downloads), timeout=timeout) as response:
+                    response.read()
+                ok = True
+        except Exception:
+            # Any failure (HTTP/connection errors, timeouts, bad responses) counts as an error; keep going
+            ok = False
+        stage.record(kind, time.perf_counter() - started, ok)
+
+
+def run_configuration(worker_class: str, workers: int, threads: int, args) -> List[dict]:
+    server = Server(worker_class, workers, threads, args.latency_scale)
+    results = []
+    try:
+        server.wait_ready()
+        downloads = [post_report(server.base_url, args.tickers, args.timeout)]
+        downloads = [d for d in downloads if d]
+        for concurrency in args.concurrency:
+            stage, stop = Stage(), threading.Event()
+            clients = [
+                threading.Thread(target=client, daemon=True, args=(
+                    server.base_url, stage, stop, downloads, args.post_ratio, args.tickers, args.timeout))
+                for _ in range(concurrency)
+            ]
+            started = time.perf_counter()
+            for thread in clients:
+                thread.start()
+            peak_rss: List[float] = []
+            while time.perf_counter() - started < args.stage_seconds:
+                time.sleep(1)
+                rss = worker_rss_mb(server.process.pid)
+                if sum(rss) > sum(peak_rss):
+                    peak_rss = rss
+            stop.set()
+            for thread in clients:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            result = {
+                "worker_class": worker_class, "workers": workers, "threads": threads,
+                "concurrency": concurrency, "seconds": elapsed,
+                "worker_rss_mb": peak_rss, **stage.summary(elapsed),
+            }
+            results.append(result)
+            print_result(result)
+    finally:
+        server.stop()
+    return results
+
+
+def fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def print_result(result: dict) -> None:
+    rss = result["worker_rss_mb"]
+    print(f"{result['worker_class']:>8} w={result['workers']} t={result['threads']} c={result['concurrency']:>3} | "
+          f"POST {result['post']['throughput_rps']:.2f}/s p50={fmt(result['post']['p50'])}s "
+          f"p90={fmt(result['post']['p90'])}s p99={fmt(result['post']['p99'])}s "
+          f"err={result['post']['error_rate']:.1%} | "
+          f"GET {result['download']['throughput_rps']:.1f}/s p99={fmt(result['download']['p99'])}s "
+          f"err={result['download']['error_rate']:.1%} | "
+          f"RSS/worker max={fmt(max(rss) if rss else None)}MB", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker-class", nargs="+", default=["sync", "gthread"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker for gthread")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--stage-seconds", type=float, default=60.0)
+    parser.add_argument("--post-ratio", type=float, default=0.2, help="Fraction of requests that generate a report")
+    parser.add_argument("--tickers", type=int, default=3, help="Tickers per report request")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for simulated backend latency")
+    parser.add_argument("--timeout", type=float, default=800.0)
+    parser.add_argument("--output", help="Write all results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for worker_class in args.worker_class:
+        for workers in args.workers:
+            threads = args.threads if worker_class == "gthread" else 1
+            results.extend(run_configuration(worker_class, workers, threads, args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Memory footprint of a research run, with and without the blob store.
+
+Runs the same portfolio against offline backends with large payloads kept inline in
+the graph state (inline) and stored once in the blob store (blob). Reports the
+tracemalloc peak during the run, the memory still held after it and the pickled size
+of the run's checkpoint history.
+
+Usage (from the repository root):
+    python -m benchmarks.memory --tickers 10 --runs 3 --latency-scale 0.01
+"""
+import argparse
+import gc
+import os
+import pickle
+import statistics
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("TRACE_EXPORTER", "off")
+
+from benchmarks.backends import FakeChatModel, FakeSearchEngine, LatencyModel, install
+from src.utils.blobs import BlobStore
+
+
+class InlineStore(BlobStore):
+    """Baseline: payloads stay in the graph state, as before the blob store."""
+
+    def put(self, text, owner=None):
+        return text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    scale = args.latency_scale
+    install(FakeChatModel(LatencyModel(2.0, 6.0, scale), LatencyModel(1.0, 3.0, scale)),
+            FakeSearchEngine(LatencyModel(1.2, 4.0, scale)))
+
+    import src.app.main as app_main
+    import src.core.nodes as nodes
+
+    # Keep each run's graph to measure its checkpoints
+    graphs = []
+    create_research_graph = app_main.create_research_graph
+    def capturing():
+        graphs.append(create_research_graph())
+        return graphs[-1]
+    app_main.create_research_graph = capturing
+
+    stocks = [f"T{i:03d}" for i in range(args.tickers)]
+    print(f"{'mode':>6} | {'peak MB':>8} | {'held after run MB':>17} | {'checkpoints MB':>14}")
+    for mode, store in (("inline", InlineStore()), ("blob", BlobStore())):
+        app_main.blob_store = nodes.blob_store = store
+        peaks, held, checkpoints = [], [], []
+        for _ in range(args.runs):
+            graphs.clear()
+            gc.collect()
+            tracemalloc.start()
+            app_main.run_stock_research(stocks, deadline_seconds=None)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+            checkpoints.append(len(pickle.dumps([saved.checkpoint for saved in graphs[-1].checkpointer.list(None)])) / 1e6)
+            # The app drops each run's graph (and its checkpoints) once the run returns
+            graphs.clear()
+            gc.collect()
+            held.append(tracemalloc.get_traced_memory()[0] / 1e6)
+            tracemalloc.stop()
+        print(f"{mode:>6} | {statistics.mean(peaks):>8.2f} | {statistics.mean(held):>17.2f} | "
+              f"{statistics.mean(checkpoints):>14.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
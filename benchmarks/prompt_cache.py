@@ -0,0 +1,74 @@
+"""
+Benchmark of provider-side prompt caching.
+
+Runs the same requests against offline backends that simulate prefix caching (prompts of
+at least 1024 tokens reuse the longest previously seen prefix, in 128-token blocks, and
+cached tokens skip prompt processing): with the cache disabled (off), with the cache and
+the prompts as they were before being ordered for caching (old, see legacy_prompts.py),
+and with the cache and the current prompts (new). Reports the mean run time and, per
+graph node, the share of prompt tokens served from the cache, as recorded from the
+responses' usage metadata.
+
+Usage (from the repository root):
+    python -m benchmarks.prompt_cache --tickers 4 --runs 5 --latency-scale 0.05
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("TRACE_EXPORTER", "off")
+
+from benchmarks import legacy_prompts
+from benchmarks.backends import FakeChatModel, FakeSearchEngine, LatencyModel, PrefixCache, install
+
+TICKERS = ["PETR4", "VALE3", "ITUB4", "BBDC4", "ABEV3", "WEGE3", "B3SA3", "BBAS3"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-scale", type=float, default=0.05)
+    parser.add_argument("--seconds-per-1k-input", type=float, default=1.0,
+                        help="Unscaled prompt processing time per 1000 uncached input tokens")
+    args = parser.parse_args()
+
+    scale = args.latency_scale
+    model = FakeChatModel(LatencyModel(2.0, 6.0, scale), LatencyModel(1.0, 3.0, scale),
+                          input_seconds_per_1k=args.seconds_per_1k_input * scale)
+    install(model, FakeSearchEngine(LatencyModel(1.2, 4.0, scale)))
+
+    import src.app.main as app_main
+    import src.core.nodes as nodes
+    from src.core.prompts import PromptCacheStats
+
+    stocks = [f"{TICKERS[i % len(TICKERS)]}{'' if i < len(TICKERS) else i}" for i in range(args.tickers)]
+    current_prompts = {name: getattr(nodes, name) for name in legacy_prompts.PROMPT_BUILDERS}
+    for mode in ("off", "old", "new"):
+        # A minimum prompt size no prompt reaches disables the simulated cache
+        model.prefix_cache = PrefixCache() if mode != "off" else PrefixCache(min_tokens=10**9)
+        for name, builder in current_prompts.items():
+            setattr(nodes, name, getattr(legacy_prompts, name) if mode == "old" else builder)
+        nodes.prompt_cache_stats = stats = PromptCacheStats()
+        totals = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            app_main.run_stock_research(stocks, deadline_seconds=None)
+            totals.append(time.perf_counter() - started)
+
+        nodes_stats = stats.stats()
+        input_tokens = sum(s["input_tokens"] for s in nodes_stats.values())
+        cached_tokens = sum(s["cached_tokens"] for s in nodes_stats.values())
+        print(f"{mode}: mean run {statistics.mean(totals):.2f}s, "
+              f"{cached_tokens / input_tokens if input_tokens else 0.0:.1%} of {input_tokens} prompt tokens cached")
+        print(f"  {'node':<20} {'calls':>6} {'prompt tokens':>14} {'cached':>8}")
+        for node, s in nodes_stats.items():
+            print(f"  {node:<20} {s['calls']:>6} {s['input_tokens']:>14} {s['cached_ratio']:>8.1%}")
+        print(flush=True)
+
+
+if __name__ == "__main__":
+    main()
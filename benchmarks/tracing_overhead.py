@@ -0,0 +1,84 @@
+"""
+Benchmark of the local tracing overhead at different sampling rates.
+
+Two measurements per sampling rate, both with spans exported to a temporary JSONL file:
+- per call: a trivial runnable invoked many times, as a graph node would be
+- per run: complete research runs against zero-latency offline backends
+
+Usage (from the repository root):
+    python -m benchmarks.tracing_overhead --rates 0 0.1 1 --calls 20000 --runs 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("LOADTEST_LATENCY_SCALE", "0")
+
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.backends import LatencyModel, FakeChatModel, FakeSearchEngine, install
+from src.utils.tracing import BatchExporter, JsonlSink, Tracer
+
+
+def make_tracer(rate: float, directory: str) -> Tracer:
+    return Tracer(BatchExporter(JsonlSink(os.path.join(directory, f"traces_{rate}.jsonl"))), rate)
+
+
+def per_call(rate: float, calls: int, directory: str) -> float:
+    """Returns the mean microseconds per node-like runnable call."""
+    tracer = make_tracer(rate, directory)
+    node = RunnableLambda(lambda x: x)
+    started = time.perf_counter()
+    for i in range(calls):
+        config = {"run_name": "node", "metadata": {"langgraph_node": "node"}}
+        callbacks = tracer.callbacks_for_run(str(i))
+        if callbacks:
+            config["callbacks"] = callbacks
+        node.invoke(i, config)
+    elapsed = time.perf_counter() - started
+    tracer.exporter.flush()
+    return elapsed / calls * 1e6
+
+
+def per_run(rate: float, runs: int, directory: str) -> float:
+    """Returns the mean seconds per research run."""
+    import src.app.main as main
+
+    main.tracer = make_tracer(rate, directory)
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        main.run_stock_research(["PETR4", "VALE3", "ITUB4"], deadline_seconds=None)
+        durations.append(time.perf_counter() - started)
+    main.tracer.exporter.flush()
+    return statistics.mean(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", nargs="+", type=float, default=[0.0, 0.1, 1.0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    no_latency = LatencyModel(1.0, 1.0, scale=0.0)
+    install(FakeChatModel(no_latency, no_latency), FakeSearchEngine(no_latency))
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline_call = baseline_run = None
+        print(f"{'rate':>6} | {'us/call':>9} {'overhead':>9} | {'ms/run':>9} {'overhead':>9}")
+        for rate in args.rates:
+            call_us = per_call(rate, args.calls, directory)
+            run_ms = per_run(rate, args.runs, directory) * 1000
+            if baseline_call is None:
+                baseline_call, baseline_run = call_us, run_ms
+            print(f"{rate:>6.0%} | {call_us:>9.1f} {call_us - baseline_call:>+9.1f} | "
+                  f"{run_ms:>9.1f} {run_ms - baseline_run:>+9.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
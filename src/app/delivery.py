@@ -0,0 +1,237 @@
+"""
+Report delivery helpers: cached HTML rendering, response compression and strong ETags.
+Located in src/app/delivery.py
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import markdown2
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_EXTRAS = ["tables", "fenced-code-blocks", "code-friendly"]
+REPORT_SUFFIX = ".md"  # Only these files are published; rendered sidecars stay internal
+RENDERED_SUFFIX = ".html"
+MIN_COMPRESS_SIZE = 1024
+
+
+def supported_encodings() -> List[str]:
+    """
+    Returns the content encodings this server can produce, in order of preference.
+    """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compresses a response body with the given content encoding.
+
+    Args:
+        body: Raw response body
+        encoding: Either "br" or "gzip"
+
+    Returns:
+        bytes: Compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(body)
+    # mtime=0 keeps the output byte-identical across calls, so ETags stay stable
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Returns a strong ETag value (without quotes) for a response body.
+    """
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def render_markdown(report_md: str) -> str:
+    """
+    Converts a Markdown report to HTML.
+
+    Args:
+        report_md: Report in Markdown
+
+    Returns:
+        str: Report in HTML
+    """
+    return markdown2.markdown(report_md, extras=MARKDOWN_EXTRAS)
+
+
+class CachedReport:
+    """
+    A report held in memory with its rendered HTML and lazily compressed representations.
+    """
+
+    def __init__(self, filename: str, markdown_bytes: bytes, html: str, mtime: float):
+        self.filename = filename
+        self.markdown_bytes = markdown_bytes
+        self.html = html
+        self.mtime = mtime
+        self.etag = make_etag(markdown_bytes)
+        self._encoded: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, kind: str, body: bytes, encoding: str) -> bytes:
+        """
+        Returns the compressed form of one of this report's bodies, compressing it only once.
+
+        Args:
+            kind: Cache key for the body (e.g. "markdown", "page")
+            body: Uncompressed body
+            encoding: Content encoding to apply
+
+        Returns:
+            bytes: Compressed body
+        """
+        key = (kind, encoding)
+        with self._lock:
+            if key not in self._encoded:
+                self._encoded[key] = compress(body, encoding)
+            return self._encoded[key]
+
+
+class ReportCache:
+    """
+    LRU cache of rendered reports backed by the reports directory.
+
+    Rendered HTML is also written next to each report as a sidecar file, so other
+    worker processes (and restarts) can reuse it instead of re-rendering the Markdown.
+    """
+
+    def __init__(self, reports_dir: str, max_entries: int = 64):
+        """
+        Initializes the report cache.
+
+        Args:
+            reports_dir: Directory where reports are stored
+            max_entries: Maximum number of reports kept in memory
+        """
+        self.reports_dir = reports_dir
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedReport]" = OrderedDict()
+        self._pages: Dict[str, bytes] = {}
+        self._listing = None
+        self._lock = threading.Lock()
+
+    def _path(self, filename: str) -> Optional[str]:
+        if not filename.endswith(REPORT_SUFFIX):
+            return None
+        return safe_join(self.reports_dir, filename)
+
+    def _remember(self, entry: CachedReport) -> CachedReport:
+        with self._lock:
+            self._entries[entry.filename] = entry
+            self._entries.move_to_end(entry.filename)
+            self._pages.pop(entry.filename, None)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._pages.pop(evicted, None)
+            self._listing = None
+        return entry
+
+    def store(self, filename: str, report_md: str) -> CachedReport:
+        """
+        Renders a freshly saved report once and caches it.
+
+        Args:
+            filename: Name of the report file in the reports directory
+            report_md: Report in Markdown
+
+        Returns:
+            CachedReport: Cached report
+        """
+        path = self._path(filename)
+        html = render_markdown(report_md)
+        try:
+            with open(path + RENDERED_SUFFIX, "w", encoding="utf-8") as f:
+                f.write(html)
+        except OSError as e:
+            logger.warning(f"Could not write rendered report for {filename}: {e}")
+        return self._remember(CachedReport(filename, report_md.encode("utf-8"), html, os.path.getmtime(path)))
+
+    def get(self, filename: str) -> Optional[CachedReport]:
+        """
+        Returns a cached report, loading and rendering it from disk if needed.
+
+        Args:
+            filename: Name of the report file in the reports directory
+
+        Returns:
+            CachedReport | None: Cached report, or None if it does not exist
+        """
+        path = self._path(filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry.mtime == mtime:
+                self._entries.move_to_end(filename)
+                return entry
+
+        with open(path, "rb") as f:
+            markdown_bytes = f.read()
+        rendered_path = path + RENDERED_SUFFIX
+        if os.path.isfile(rendered_path) and os.path.getmtime(rendered_path) >= mtime:
+            with open(rendered_path, "r", encoding="utf-8") as f:
+                html = f.read()
+        else:
+            html = render_markdown(markdown_bytes.decode("utf-8"))
+            try:
+                with open(rendered_path, "w", encoding="utf-8") as f:
+                    f.write(html)
+            except OSError as e:
+                logger.warning(f"Could not write rendered report for {filename}: {e}")
+        return self._remember(CachedReport(filename, markdown_bytes, html, mtime))
+
+    def page(self, entry: CachedReport, render) -> bytes:
+        """
+        Returns the full HTML page for a report, rendering the template only once.
+
+        Args:
+            entry: Cached report
+            render: Callable returning the page as a string
+
+        Returns:
+            bytes: Page body
+        """
+        with self._lock:
+            body = self._pages.get(entry.filename)
+        if body is None:
+            body = render().encode("utf-8")
+            with self._lock:
+                if self._entries.get(entry.filename) is entry:
+                    self._pages[entry.filename] = body
+        return body
+
+    def listing(self) -> List[Dict[str, object]]:
+        """
+        Returns the available reports, newest first. Recomputed only when the directory changes.
+        """
+        mtime = os.path.getmtime(self.reports_dir)
+        with self._lock:
+            if self._listing is not None and self._listing[0] == mtime:
+                return self._listing[1]
+        reports = []
+        with os.scandir(self.reports_dir) as it:
+            for item in it:
+                if item.is_file() and item.name.endswith(REPORT_SUFFIX):
+                    stat = item.stat()
+                    reports.append({"filename": item.name, "size": stat.st_size, "modified": stat.st_mtime})
+        reports.sort(key=lambda r: r["modified"], reverse=True)
+        with self._lock:
+            self._listing = (mtime, reports)
+        return reports
@@ -2,16 +2,19 @@
 Main entry point for the stock research application with Flask UI.
 Located in src/app/main.py
 """
+import hmac
 import json
 import uuid
 import logging
 import os
 import subprocess
+import threading
+import time
+import tracemalloc
 from typing import List, Dict, Any
 from datetime import datetime
 
-from flask import Flask, render_template, request, send_from_directory, redirect, url_for, flash
-import markdown2
+from flask import Flask, render_template, request, send_from_directory, redirect, url_for, flash, jsonify, make_response, abort
 
 # Configure logging first so it's available for import attempts
 logging.basicConfig(
@@ -37,40 +40,230 @@ except ImportError as e_main:
         logger.error(f"Fallback ImportError for src.core.agent.graph: {e_fallback}", exc_info=True)
         raise
 
+from src.config import (
+    TRACK_MEMORY, ADMIN_TOKEN, PROFILE_DIR, DEFAULT_DEADLINE_SECONDS, MAX_DEADLINE_SECONDS, DEADLINE_GRACE_SECONDS,
+    BATCH_TICKER_THRESHOLD, TRUSTED_PROXIES
+)
+from src.core.nodes import assemble_partial_report
+from src.core.prefetch import prefetcher
+from src.core.digest import digests
+from src.core.runs import runs, RunCancelled
+from src.core.prompts import prompt_cache_stats
+from src.core.scheduling import scheduler, SlotTimeout, INTERACTIVE, BATCH, DEFAULT_TENANT
+from src.utils.blobs import blob_store
+from src.utils.profiling import RunProfile, should_profile, list_profiles
+from src.utils.hedging import hedger
+from src.utils.tracing import tracer
+from src.core.prewarm import GEOPOLITICAL_KEY, PrewarmScheduler, section_store
+from src.app.delivery import ReportCache, render_markdown, make_etag, supported_encodings, compress, MIN_COMPRESS_SIZE, REPORT_SUFFIX
+
 # Flask app initialization
 app = Flask(__name__, template_folder='templates', static_folder='static') 
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "super_secret_key_for_dev_only")
 
-REPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'reports'))
+REPORTS_DIR = os.path.abspath(os.environ.get("REPORTS_DIR", os.path.join(os.path.dirname(__file__), 'reports')))
 if not os.path.exists(REPORTS_DIR):
     os.makedirs(REPORTS_DIR)
     logger.info(f"Created reports directory: {REPORTS_DIR}")
 
-def run_stock_research(stocks: List[str], topic: str = "Brazilian Stock Research") -> Dict[str, Any]:
+report_cache = ReportCache(REPORTS_DIR)
+
+prewarm_scheduler = PrewarmScheduler(store=section_store)
+prewarm_scheduler.start()
+
+# tracemalloc is process-wide: it runs while at least one run tracks memory
+_memory_lock = threading.Lock()
+_memory_runs = 0
+
+def start_memory_tracking() -> bool:
+    """
+    Starts tracemalloc for a run, unless something else already traces memory.
+    Returns True if the run took a reference, which it must give back with `stop_memory_tracking`.
+    """
+    global _memory_runs
+    with _memory_lock:
+        if _memory_runs == 0:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start()
+        _memory_runs += 1
+        return True
+
+def stop_memory_tracking() -> None:
+    """Gives back a run's reference; the last run stops tracemalloc."""
+    global _memory_runs
+    with _memory_lock:
+        _memory_runs -= 1
+        if _memory_runs == 0:
+            tracemalloc.stop()
+
+def build_initial_state(stocks: List[str], topic: str, run_id: str) -> Dict[str, Any]:
+    """
+    Seeds the graph with pre-warmed sections. Only stocks without a fresh section are researched live;
+    when all of them (and the geopolitical section) are fresh, the graph goes straight to the writers.
+    """
+    cached = section_store.lookup(stocks)
+    missing = [s for s in stocks if s not in cached]
+    sections = [cached[s] for s in stocks if s in cached]
+    if not missing:
+        geopolitical = section_store.get_fresh(GEOPOLITICAL_KEY)
+        if geopolitical is None:
+            missing, sections = stocks, []
+        else:
+            sections.append(geopolitical)
+    if cached:
+        logger.info(f"Using pre-warmed sections for: {', '.join(cached)}")
+    return {"topic": topic, "stocks": missing, "sections": [blob_store.put(s, run_id) for s in sections]}
+
+def _preferred_encoding() -> str | None:
+    """Returns the best content encoding accepted by the client, if any."""
+    return request.accept_encodings.best_match(supported_encodings())
+
+def _send_cached(body: bytes, etag: str, mimetype: str, kind: str = None, entry=None, download_name: str = None):
+    """
+    Builds a conditional response for an in-memory body, compressed when the client accepts it.
+    Each encoding gets its own strong ETag, since the bytes on the wire differ.
+    """
+    encoding = _preferred_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding:
+        body = entry.encoded(kind, body, encoding) if entry is not None else compress(body, encoding)
+        etag = f"{etag}-{encoding}"
+    response = make_response(body)
+    response.mimetype = mimetype
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.no_cache = True
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if download_name:
+        response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    # Byte ranges are only offered on the identity representation
+    if encoding:
+        return response.make_conditional(request)
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+@app.after_request
+def compress_response(response):
+    """Compresses dynamically generated HTML/JSON responses (report generation, errors)."""
+    if (response.direct_passthrough or response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in ("text/html", "application/json")):
+        return response
+    body = response.get_data()
+    encoding = _preferred_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+    return response
+
+def execute_research_graph(research_graph, state: Dict[str, Any], thread: Dict[str, Any]) -> None:
+    logger.info("Starting research graph execution...")
+    for event in research_graph.stream(state, thread, stream_mode="values"):
+        analysts = event.get('analysts', [])
+        if analysts:
+            logger.info(f"Generated {len(analysts)} analysts.")
+    logger.info("Continuing execution to generate the report...")
+    for event in research_graph.stream(None, thread, stream_mode="update"):
+        node_name = next(iter(event.keys()), None)
+        if node_name:
+            logger.info(f"Executing node: {node_name}")
+
+def run_stock_research(stocks: List[str], topic: str = "Brazilian Stock Research", profile: bool = False,
+                       deadline_seconds: float | None = DEFAULT_DEADLINE_SECONDS,
+                       tenant: str = DEFAULT_TENANT, priority: str | None = None) -> Dict[str, Any]:
     logger.info(f"Starting research on: {topic}")
     logger.info(f"Stocks to be analyzed: {', '.join(stocks)}")
+    # Large portfolios are batch work: they share the LLM budget fairly instead of monopolizing it
+    if priority is None:
+        priority = BATCH if len(stocks) > BATCH_TICKER_THRESHOLD else INTERACTIVE
+    tracking_memory = TRACK_MEMORY and start_memory_tracking()
+    thread_id = str(uuid.uuid4())
+    run_profile = RunProfile(thread_id).start() if should_profile(profile) else None
+    scheduler.register(thread_id, tenant, priority)
+
+    def cleanup():
+        prefetcher.discard(thread_id)
+        digests.discard(thread_id)
+        scheduler.unregister(thread_id)
+        runs.discard(thread_id)
+        blob_store.release(thread_id)
+        if tracking_memory:
+            stop_memory_tracking()
+        if run_profile is not None:
+            run_profile.stop()
+
+    # A worker still running past the deadline cleans up the run itself, once it has unwound
+    handoff = {"worker_running": False, "detached": False}
+    handoff_lock = threading.Lock()
     try:
         research_graph = create_research_graph()
-        thread_id = str(uuid.uuid4())
         thread = {"configurable": {"thread_id": thread_id}}
-        logger.info(f"Thread ID: {thread_id}")
-        state = {"topic": topic, "stocks": stocks}
-        logger.info("Starting research graph execution...")
-        for event in research_graph.stream(state, thread, stream_mode="values"):
-            analysts = event.get('analysts', [])
-            if analysts:
-                logger.info(f"Generated {len(analysts)} analysts.")
-        logger.info("Continuing execution to generate the report...")
-        for event in research_graph.stream(None, thread, stream_mode="update"):
-            node_name = next(iter(event.keys()), None)
-            if node_name:
-                logger.info(f"Executing node: {node_name}")
+        callbacks = tracer.callbacks_for_run(thread_id)
+        if run_profile is not None:
+            callbacks += run_profile.callbacks
+        if callbacks:
+            thread["callbacks"] = callbacks
+        logger.info(f"Thread ID: {thread_id} (tenant {tenant}, {priority})")
+        state = build_initial_state(stocks, topic, thread_id)
+        state["run_id"] = thread_id
+        runs.start(thread_id, state["sections"])
+        if not deadline_seconds:
+            execute_research_graph(research_graph, state, thread)
+        else:
+            # Nodes adapt to the remaining time; if the graph still overruns, return what exists so far.
+            # The graph's deadline keeps the grace period of the budget to assemble that partial report.
+            state["deadline"] = time.time() + max(0.0, deadline_seconds - DEADLINE_GRACE_SECONDS)
+            errors, out_of_time = [], threading.Event()
+            def target():
+                try:
+                    execute_research_graph(research_graph, state, thread)
+                except (RunCancelled, SlotTimeout):
+                    # Cancelled past the deadline, or no LLM/search slot freed up before it
+                    logger.info(f"Run {thread_id} stopped at its deadline")
+                    out_of_time.set()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    with handoff_lock:
+                        handoff["worker_running"] = False
+                        detached = handoff["detached"]
+                    if detached:
+                        cleanup()
+            handoff["worker_running"] = True
+            worker = threading.Thread(target=target, name=f"research-{thread_id[:8]}", daemon=True)
+            worker.start()
+            worker.join(deadline_seconds)
+            if errors:
+                raise errors[0]
+            if worker.is_alive() or out_of_time.is_set():
+                logger.warning(f"Deadline of {deadline_seconds:.0f}s exceeded, returning a partial report")
+                # The graph stops at its next LLM or search call
+                runs.cancel(thread_id)
+                # Running interview branches have not reached the checkpoint: use the sections recorded so far
+                values = {"topic": topic, **research_graph.get_state(thread).values,
+                          "run_id": thread_id, "sections": runs.sections(thread_id)}
+                values["timed_out"] = True
+                partial_report = assemble_partial_report(values)
+                if partial_report is not None:
+                    values["final_report"] = partial_report
+                return values
         final_state = research_graph.get_state(thread)
         logger.info("Research completed successfully!")
+        if TRACK_MEMORY and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            checkpoints = sum(1 for _ in research_graph.get_state_history(thread))
+            logger.info(f"Memory: current={current / 1e6:.1f}MB peak={peak / 1e6:.1f}MB, "
+                        f"checkpoints={checkpoints}, blob store={blob_store.stats()}")
         return final_state.values
     except Exception as e:
         logger.error(f"Error during stock research: {e}", exc_info=True)
         return None
+    finally:
+        with handoff_lock:
+            handoff["detached"] = detached = handoff["worker_running"]
+        if not detached:
+            cleanup()
 
 def save_report_for_download(report_content: str) -> str | None:
     try:
@@ -86,6 +279,16 @@ def save_report_for_download(report_content: str) -> str | None:
         logger.error(f"Error saving report for download: {e}", exc_info=True)
         return None
 
+def request_tenant() -> str:
+    """
+    Tenant of a request for fair scheduling: the X-Tenant-Id header when the request comes through
+    a trusted proxy (TRUSTED_PROXIES), otherwise the client address. Clients cannot pick their tenant.
+    """
+    tenant = request.headers.get('X-Tenant-Id', '').strip()
+    if tenant and request.remote_addr in TRUSTED_PROXIES:
+        return tenant
+    return request.remote_addr or DEFAULT_TENANT
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     report_html = None
@@ -96,25 +299,48 @@ def index():
         stocks_input = request.form.get('stocks', '').strip()
         if not stocks_input:
             error_message = "Please enter at least one stock symbol."
-            return render_template('index.html', error_message=error_message, request=request)
+            return render_template('index.html', error_message=error_message, report_html=None,
+                                   processing_message=None, request=request)
         stocks = [s.strip().upper() for s in stocks_input.replace('\n', ',').split(',') if s.strip()]
         if not stocks:
             error_message = "No valid stock symbols were provided after processing."
-            return render_template('index.html', error_message=error_message, request=request)
+            return render_template('index.html', error_message=error_message, report_html=None,
+                                   processing_message=None, request=request)
         logger.info(f"Received stock symbols for research: {stocks}")        
         processing_message = f"Processing report for stocks: {', '.join(stocks)}. This may take a few minutes..."
-        results = run_stock_research(stocks)
+        # Profiling writes artifacts to disk and runs a sampler: only admins may request it
+        profile = (request.headers.get('X-Profile') == '1' or request.form.get('profile') == '1') and is_admin()
+        deadline_input = request.headers.get('X-Deadline-Seconds') or request.form.get('deadline', '').strip()
+        try:
+            deadline_seconds = float(deadline_input) if deadline_input else DEFAULT_DEADLINE_SECONDS
+        except ValueError:
+            deadline_seconds = None
+        # Also rejects "nan" and "inf"
+        if deadline_seconds is None or not 0 < deadline_seconds <= MAX_DEADLINE_SECONDS:
+            error_message = f"The time limit must be a number of seconds between 0 and {MAX_DEADLINE_SECONDS:.0f}."
+            return render_template('index.html', error_message=error_message, report_html=None,
+                                   processing_message=None, request=request), 400
+        tenant = request_tenant()
+        priority = BATCH if request.headers.get('X-Priority', '').lower() == BATCH else None
+        results = run_stock_research(stocks, profile=profile, deadline_seconds=deadline_seconds,
+                                     tenant=tenant, priority=priority)
         if results and "final_report" in results:
             report_md = results["final_report"]
+            report_filename = save_report_for_download(report_md)
             try:
-                report_html = markdown2.markdown(report_md, extras=["tables", "fenced-code-blocks", "code-friendly"])
+                # Rendered once here; later views of this report are served from the cache
+                if report_filename:
+                    report_html = report_cache.store(report_filename, report_md).html
+                else:
+                    flash("Error saving the report file for download.", "error")
+                    report_html = render_markdown(report_md)
             except Exception as e:
                 logger.error(f"Error converting Markdown to HTML: {e}")
                 error_message = "Error converting report for display."
                 report_html = f"<p>Error rendering report: {e}</p><pre>{report_md}</pre>"
-            report_filename = save_report_for_download(report_md)
-            if not report_filename:
-                flash("Error saving the report file for download.", "error")
+        elif results and results.get("timed_out"):
+            error_message = (f"The time limit of {deadline_seconds:.0f} seconds was reached before any section "
+                             "was finished. Please try again with a longer time limit or fewer stocks.")
         elif results is None:
             error_message = "An internal error occurred while generating the report. Please check the logs for more details."
         else:
@@ -127,11 +353,42 @@ def index():
                            processing_message=processing_message,
                            request=request)
 
+@app.route('/reports')
+def list_reports():
+    reports = report_cache.listing()
+    body = jsonify([
+        {**r, "view_url": url_for('view_report', filename=r["filename"]),
+         "download_url": url_for('download_report', filename=r["filename"])}
+        for r in reports
+    ]).get_data()
+    return _send_cached(body, make_etag(body), "application/json")
+
+@app.route('/report/<filename>')
+def view_report(filename):
+    entry = report_cache.get(filename)
+    if entry is None:
+        flash("Report file not found.", "error")
+        return redirect(url_for('index'))
+    page = report_cache.page(entry, lambda: render_template(
+        'index.html', report_html=entry.html, report_filename=filename,
+        error_message=None, processing_message=None, request=request))
+    return _send_cached(page, make_etag(page), "text/html", kind="page", entry=entry)
+
 @app.route('/download/<filename>')
 def download_report(filename):
     logger.info(f"Attempting to download report: {filename} from {REPORTS_DIR}")
+    if not filename.endswith(REPORT_SUFFIX):
+        # Rendered HTML sidecars and any other files in the reports directory are not published
+        flash("Report file not found.", "error")
+        return redirect(url_for('index'))
     try:
-        return send_from_directory(REPORTS_DIR, filename, as_attachment=True)
+        entry = report_cache.get(filename)
+        if entry is not None and "Range" not in request.headers:
+            return _send_cached(entry.markdown_bytes, entry.etag, "text/markdown",
+                                kind="markdown", entry=entry, download_name=filename)
+        # Range requests (and reports not cached yet) are served from disk by Werkzeug
+        return send_from_directory(REPORTS_DIR, filename, as_attachment=True,
+                                   etag=entry.etag if entry is not None else True)
     except FileNotFoundError:
         logger.error(f"File not found for download: {filename} in {REPORTS_DIR}")
         flash("Report file not found.", "error")
@@ -141,6 +398,49 @@ def download_report(filename):
         flash("Error downloading the report file.", "error")
         return redirect(url_for('index'))
 
+def is_admin() -> bool:
+    """
+    Whether the request carries the configured admin token in the X-Admin-Token header.
+    Query strings end up in access logs, so they are not accepted.
+    """
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+def require_admin():
+    """
+    Aborts unless the request is from an admin (admin endpoints are off without a configured token).
+    """
+    if not ADMIN_TOKEN:
+        abort(404)
+    if not is_admin():
+        abort(403)
+
+@app.route('/admin/profiles')
+def list_run_profiles():
+    require_admin()
+    return jsonify(list_profiles())
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    require_admin()
+    return jsonify({
+        "scheduler": scheduler.stats(),
+        "hedging": hedger.stats(),
+        "prefetch": prefetcher.stats(),
+        "digest": digests.stats(),
+        "runs": runs.stats(),
+        "prompt_cache": prompt_cache_stats.stats(),
+        "blob_store": blob_store.stats(),
+        "tracing": tracer.exporter.stats() if tracer.exporter is not None else None,
+    })
+
+@app.route('/admin/profiles/<filename>')
+def download_run_profile(filename):
+    require_admin()
+    return send_from_directory(PROFILE_DIR, filename, as_attachment=True)
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)), debug=True)
 
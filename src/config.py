@@ -14,9 +14,26 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY")
 LANGCHAIN_API_KEY = os.environ.get("LANGCHAIN_API_KEY")
 
+# Tracing settings
+# TRACE_EXPORTER: "local" (sampled spans batched to a local JSONL/SQLite file), "langsmith" or "off"
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "local").lower()
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.1))  # Fraction of runs traced
+TRACE_SINK = os.environ.get("TRACE_SINK", "jsonl").lower()  # "jsonl" or "sqlite"
+TRACE_DIR = os.environ.get(
+    "TRACE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "traces"))
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", 10000))  # Spans held before dropping
+TRACE_BATCH_SIZE = 200
+TRACE_FLUSH_INTERVAL_SECONDS = 2.0
+
 # LangChain configurations
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-os.environ["LANGCHAIN_PROJECT"] = "Stock_Report"
+os.environ.setdefault("LANGCHAIN_PROJECT", "Stock_Report")
+if TRACE_EXPORTER == "langsmith":
+    os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
+    os.environ.setdefault("LANGSMITH_TRACING_SAMPLING_RATE", str(TRACE_SAMPLE_RATE))
+else:
+    # Overrides a LANGCHAIN_TRACING_V2=true left in .env: traces only go to LangSmith when selected
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    os.environ["LANGSMITH_TRACING"] = "false"
 
 # Date settings
 CURRENT_DATE = datetime.now()
@@ -27,8 +44,86 @@ DEFAULT_TEMPERATURE = 0.5
 
 # Search settings
 MAX_SEARCH_RESULTS = 3
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 256))
+SEARCH_CACHE_TTL_SECONDS = int(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 3600))
 
 # Interview settings
 DEFAULT_MAX_TURNS = 2
 
+# Speculative prefetch of baseline per-ticker searches while analysts are generated
+SPECULATIVE_PREFETCH = os.environ.get("SPECULATIVE_PREFETCH", "true").lower() == "true"
+PREFETCH_MAX_WORKERS = int(os.environ.get("PREFETCH_MAX_WORKERS", 8))
+PREFETCH_WAIT_SECONDS = 20.0  # Longest an interview waits for its prefetched search
+PREFETCH_QUERY_TEMPLATE = "{stock} stock B3 price forecast, analyst recommendations and recent news"
+
+# Fair scheduling of LLM and search calls across tenants. The budget and the queues are per worker
+# process: with several gunicorn workers the provider sees workers x LLM_MAX_IN_FLIGHT calls
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", 16))  # Provider concurrency budget
+SEARCH_MAX_IN_FLIGHT = int(os.environ.get("SEARCH_MAX_IN_FLIGHT", 8))
+TENANT_WEIGHTS = {  # e.g. TENANT_WEIGHTS="research-desk:2,10.0.0.7:0.5"; unlisted tenants weigh 1
+    name.strip(): float(weight)
+    for name, _, weight in (item.rpartition(":") for item in os.environ.get("TENANT_WEIGHTS", "").split(","))
+    if name.strip()
+}
+INTERACTIVE_WEIGHT = 4.0  # Share multiplier of interactive requests over batch work
+BATCH_MAX_SHARE = 0.75  # Fraction of the budget batch work may hold, kept free for interactive requests
+BATCH_TICKER_THRESHOLD = int(os.environ.get("BATCH_TICKER_THRESHOLD", 10))  # Larger requests run as batch
+# Addresses of the reverse proxies allowed to set X-Tenant-Id; other clients are identified by their address
+TRUSTED_PROXIES = {a.strip() for a in os.environ.get("TRUSTED_PROXIES", "").split(",") if a.strip()}
+
+# Hedged requests (opt-in per node): a call running past its rolling latency percentile gets a duplicate
+# HEDGE_NODES: graph nodes whose LLM calls are hedged, plus "search" for web searches,
+# e.g. "generate_answer,write_section,search"
+HEDGE_NODES = {n.strip() for n in os.environ.get("HEDGE_NODES", "").split(",") if n.strip()}
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 95))
+HEDGE_MAX_RATIO = float(os.environ.get("HEDGE_MAX_RATIO", 0.1))  # Extra calls, as a fraction of hedged-node calls
+HEDGE_MIN_SAMPLES = 20  # Calls observed per node before hedging starts
+HEDGE_WINDOW = 200  # Recent durations kept per node
+
+# Incremental reduce: large runs merge sections into a digest while interviews are still running
+INCREMENTAL_REDUCE = os.environ.get("INCREMENTAL_REDUCE", "true").lower() == "true"
+INCREMENTAL_REDUCE_MIN_SECTIONS = int(os.environ.get("INCREMENTAL_REDUCE_MIN_SECTIONS", 8))  # Smaller runs are unchanged
+DIGEST_FAN_IN = 4  # Sections (then digests) merged into one digest
+DIGEST_MAX_WORDS = 400
+DIGEST_WAIT_SECONDS = 15.0  # Longest the final writers wait for merges still running
+DIGEST_MAX_WORKERS = int(os.environ.get("DIGEST_MAX_WORKERS", 4))
+
+# Deadline settings: a run's latency budget and the time each stage is expected to need.
+# Nodes degrade (fewer turns, cheaper searches, shorter sections, templated intro/conclusion)
+# when the remaining time drops below these thresholds.
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("DEFAULT_DEADLINE_SECONDS", 600))  # Below gunicorn's 800s timeout
+MAX_DEADLINE_SECONDS = float(os.environ.get("MAX_DEADLINE_SECONDS", 780))  # Largest time limit a request may ask for
+DEADLINE_TURN_SECONDS = 25.0  # One more question/search/answer round
+DEADLINE_FINAL_STAGE_SECONDS = 30.0  # write_section plus the final writers
+DEADLINE_SEARCH_SECONDS = 40.0  # Below this, skip LLM query generation
+DEADLINE_SHORT_SECTION_SECONDS = 45.0  # Below this, write shorter sections
+DEADLINE_WRITER_SECONDS = 15.0  # Below this, template the introduction and conclusion
+DEADLINE_GRACE_SECONDS = 5.0  # End of the time limit kept to assemble a partial report
+
+# Pre-warming settings (per-ticker sections generated off-peak for a watchlist)
+PREWARM_WATCHLIST = [s.strip().upper() for s in os.environ.get("PREWARM_WATCHLIST", "").split(",") if s.strip()]
+PREWARM_AT = os.environ.get("PREWARM_AT", "07:00")  # Local time of day (HH:MM) to refresh sections
+PREWARM_UTC_OFFSET_HOURS = int(os.environ.get("PREWARM_UTC_OFFSET_HOURS", -3))  # BRT
+PREWARM_MAX_CONCURRENCY = int(os.environ.get("PREWARM_MAX_CONCURRENCY", 2))
+PREWARM_DAILY_BUDGET = int(os.environ.get("PREWARM_DAILY_BUDGET", 50))  # Max interviews per day
+PREWARM_SECTION_TTL_SECONDS = int(os.environ.get("PREWARM_SECTION_TTL_SECONDS", 8 * 3600))
+PREWARM_DIR = os.environ.get(
+    "PREWARM_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "sections"))
+
+# Profiling settings (per request with the X-Profile header from an admin, or a sampled fraction of runs)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_SECONDS", 0.005))
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "profiles"))
+PROFILE_MAX_KEPT = int(os.environ.get("PROFILE_MAX_KEPT", 50))  # Newest profiles kept; older ones are deleted
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Blob store settings (large graph payloads are kept once, referenced by hash)
+BLOB_STORE_MAX_BYTES = int(os.environ.get("BLOB_STORE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Logs peak/current memory of each research run (tracemalloc adds overhead, keep it off in production)
+TRACK_MEMORY = os.environ.get("TRACK_MEMORY", "false").lower() == "true"
+
 
@@ -8,7 +8,7 @@ from ..state import AnalystGenerationState, InterviewState, ResearchGraphState
 from ..nodes import (
     create_analysts, generate_question, web_search, generate_answer, 
     save_interview, write_section, start_all_interviews, write_report,
-    write_introduction, write_conclusion, finalize_report, route_messages
+    write_introduction, write_conclusion, finalize_report, route_messages, route_start
 )
 
 def create_analyst_generation_graph() -> StateGraph:
@@ -71,7 +71,8 @@ def create_research_graph() -> StateGraph:
     main_builder.add_node("finalize_report", finalize_report)
 
     # Connects the nodes in the main flow
-    main_builder.add_edge(START, "create_analysts")
+    main_builder.add_conditional_edges(
+        START, route_start, ["create_analysts", "write_report", "write_introduction", "write_conclusion"])
     main_builder.add_conditional_edges("create_analysts", start_all_interviews, ["conduct_interview"])
     main_builder.add_edge("conduct_interview", "write_report")
     main_builder.add_edge("conduct_interview", "write_introduction")
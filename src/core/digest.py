@@ -0,0 +1,227 @@
+"""
+Incremental reduce of report sections.
+
+The final writers can only start once every interview has finished, and their prompts
+grow with the number of sections. For large portfolios, each section is registered as
+soon as its interview writes it: its citations are renumbered against the run's global
+source list right away, and every `fan_in` sections (later, every `fan_in` digests) are
+merged into a digest in the background, tree-style. When the last interview finishes,
+the writers get the digests plus the few sections not merged yet, so the final prompt
+stays bounded and little work is left on the critical path.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ..config import (
+    DIGEST_FAN_IN, DIGEST_MAX_WORKERS, DIGEST_WAIT_SECONDS, DEADLINE_FINAL_STAGE_SECONDS
+)
+from ..utils.citations import CitationRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class DigestSnapshot(NamedTuple):
+    """
+    What the final writers work from.
+    """
+    parts: List[str]  # Digests and unmerged section bodies, with global citation markers
+    bodies: List[str]  # Every section body, with global citation markers
+    sources: List[str]  # Global source list; marker [n] refers to sources[n - 1]
+
+
+class _Item(NamedTuple):
+    text: str
+    refs: Tuple[str, ...]  # Sections covered
+
+
+class RunDigest:
+    """
+    Sections of one run, merged level by level as they arrive.
+    """
+
+    def __init__(self, merge: Callable[[List[str]], str], executor: ThreadPoolExecutor,
+                 fan_in: int = DIGEST_FAN_IN, deadline: Optional[float] = None):
+        """
+        Initializes the digest.
+
+        Args:
+            merge: Merges section bodies (or digests) into one digest, keeping the citation markers
+            executor: Pool running the merges
+            fan_in: Number of items merged into one digest
+            deadline: Unix timestamp by which the run must finish; no merge starts close to it
+        """
+        self.merge = merge
+        self.executor = executor
+        self.fan_in = max(2, fan_in)
+        self.deadline = deadline
+        self.registry = CitationRegistry()
+        self.bodies: Dict[str, str] = {}
+        self._levels: Dict[int, List[_Item]] = {}
+        self._running: Dict[Future, Tuple[int, List[_Item]]] = {}
+        self._failed: List[_Item] = []
+        self._frozen: Optional[Tuple[Tuple[str, ...], DigestSnapshot]] = None
+        self._freezing: Optional[Tuple[str, ...]] = None  # Sections of the snapshot being built
+        self._closed = False
+        # Reentrant: a merge that is already done runs its callback in the submitting thread
+        self._lock = threading.RLock()
+        self._merged = threading.Condition(self._lock)
+        self.merges = 0
+
+    def add(self, ref: str, section: str) -> None:
+        """
+        Registers a finished section (once per reference) and starts the merges it completes.
+        """
+        with self._lock:
+            self._add(ref, section)
+            self._schedule()
+
+    def _add(self, ref: str, section: str) -> None:
+        if ref in self.bodies:
+            return
+        body = self.registry.add_section(section)
+        self.bodies[ref] = body
+        self._levels.setdefault(0, []).append(_Item(body, (ref,)))
+
+    def _schedule(self) -> None:
+        """Starts a merge for every complete group of items (called with the lock held)."""
+        if self._frozen is not None or self._closed:
+            return
+        if self.deadline is not None and self.deadline - time.time() < DEADLINE_FINAL_STAGE_SECONDS:
+            return
+        for level in sorted(self._levels):
+            items = self._levels[level]
+            while len(items) >= self.fan_in:
+                group, items[:] = items[:self.fan_in], items[self.fan_in:]
+                future = self.executor.submit(self._merge, [item.text for item in group])
+                self._running[future] = (level, group)
+                future.add_done_callback(self._on_merged)
+
+    def _merge(self, texts: List[str]) -> Optional[str]:
+        # Merges queued before the run was discarded are skipped
+        if self._closed:
+            return None
+        return self.merge(texts)
+
+    def _on_merged(self, future: Future) -> None:
+        with self._lock:
+            level, group = self._running.pop(future)
+            if self._closed:
+                self._merged.notify_all()
+                return
+            try:
+                digest = future.result()
+                self._levels.setdefault(level + 1, []).append(
+                    _Item(digest, tuple(ref for item in group for ref in item.refs)))
+                self.merges += 1
+            except Exception as e:
+                logger.warning(f"Merging {len(group)} sections failed, keeping them unmerged: {e}")
+                self._failed.extend(group)
+            self._schedule()
+            self._merged.notify_all()
+
+    def close(self) -> None:
+        """
+        Stops the digest: no new merge starts and merges still queued are cancelled.
+        """
+        with self._lock:
+            self._closed = True
+            running = list(self._running)
+        for future in running:
+            future.cancel()
+
+    def snapshot(self, sections: Iterable[Tuple[str, str]], wait: float = DIGEST_WAIT_SECONDS) -> DigestSnapshot:
+        """
+        Returns the writers' input for the given sections, waiting a bounded time for running merges.
+
+        Every call with the same sections returns the same snapshot, so the parallel writers
+        agree on the content and citation numbers.
+
+        Args:
+            sections: (reference, section) pairs; sections not registered yet are added unmerged
+            wait: Maximum seconds to wait for merges still running
+        """
+        sections = list(sections)
+        refs = tuple(ref for ref, _ in sections)
+        with self._lock:
+            # Waiting for merges releases the lock: the first caller builds the snapshot, the
+            # others with the same sections wait for it instead of building their own
+            while self._freezing == refs:
+                self._merged.wait()
+            if self._frozen is not None and self._frozen[0] == refs:
+                return self._frozen[1]
+            self._freezing = refs
+            try:
+                for ref, section in sections:
+                    self._add(ref, section)
+                end = time.monotonic() + max(0.0, wait)
+                while self._running and time.monotonic() < end:
+                    self._merged.wait(end - time.monotonic())
+
+                # Highest levels first: digests, then merges still running (as their inputs), then stragglers
+                items = [(level, item) for level, level_items in self._levels.items() for item in level_items]
+                items += [(level, item) for level, group in self._running.values() for item in group]
+                items += [(0, item) for item in self._failed]
+                items.sort(key=lambda entry: -entry[0])
+                wanted = set(refs)
+                parts = [item.text for _, item in items if wanted.intersection(item.refs)]
+                snapshot = DigestSnapshot(parts, [self.bodies[ref] for ref in refs], list(self.registry.sources))
+                self._frozen = (refs, snapshot)
+                return snapshot
+            finally:
+                if self._freezing == refs:
+                    self._freezing = None
+                self._merged.notify_all()
+
+class DigestRegistry:
+    """
+    Incremental digests keyed by run.
+    """
+
+    def __init__(self, max_workers: int = DIGEST_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="digest")
+        self._runs: Dict[str, RunDigest] = {}
+        self._lock = threading.Lock()
+
+    def start(self, run_id: str, merge: Callable[[List[str]], str], deadline: Optional[float] = None,
+              fan_in: int = DIGEST_FAN_IN) -> RunDigest:
+        """
+        Starts the incremental digest of a run (a no-op if it already has one).
+        """
+        with self._lock:
+            digest = self._runs.get(run_id)
+            if digest is None:
+                digest = self._runs[run_id] = RunDigest(merge, self._executor, fan_in, deadline)
+            return digest
+
+    def get(self, run_id: Optional[str]) -> Optional[RunDigest]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def add(self, run_id: Optional[str], ref: str, section: str) -> None:
+        """
+        Registers a section with its run's digest, if the run has one.
+        """
+        digest = self.get(run_id)
+        if digest is not None:
+            digest.add(ref, section)
+
+    def discard(self, run_id: str) -> None:
+        """
+        Drops the digest of a finished run and cancels its pending merges.
+        """
+        with self._lock:
+            digest = self._runs.pop(run_id, None)
+        if digest is not None:
+            digest.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            digests = list(self._runs.values())
+        return {"runs": len(digests), "merges": sum(d.merges for d in digests)}
+
+
+# Process-wide registry shared by all runs
+digests = DigestRegistry()
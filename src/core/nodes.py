@@ -1,8 +1,9 @@
 """
 Implementation of graph nodes for the stock research agent.
 """
-from typing import Dict, Any, List
-from langchain_core.messages import HumanMessage, SystemMessage, get_buffer_string, AIMessage
+import logging
+from typing import Dict, Any, List, Optional
+from langchain_core.messages import HumanMessage, get_buffer_string, AIMessage
 from langchain_openai import ChatOpenAI
 from langgraph.constants import Send
 
@@ -10,11 +11,32 @@ from .state import (
     Analyst, Perspectives, ResearchQuery, AnalystGenerationState,
     InterviewState, ResearchGraphState
 )
-from ..config import OPENAI_API_KEY, DEFAULT_MODEL, DEFAULT_TEMPERATURE, CURRENT_DATE
+from ..config import (
+    OPENAI_API_KEY, DEFAULT_MODEL, DEFAULT_TEMPERATURE,
+    DEADLINE_TURN_SECONDS, DEADLINE_FINAL_STAGE_SECONDS, DEADLINE_SEARCH_SECONDS,
+    DEADLINE_SHORT_SECTION_SECONDS, DEADLINE_WRITER_SECONDS, SPECULATIVE_PREFETCH, PREFETCH_WAIT_SECONDS,
+    INCREMENTAL_REDUCE, INCREMENTAL_REDUCE_MIN_SECTIONS, DIGEST_WAIT_SECONDS
+)
 from ..retriever.search import SearchEngine
-from ..utils.helpers import get_num_specialist_answers, format_sections_string, split_content_and_sources
+from ..utils.helpers import (
+    get_num_specialist_answers, format_sections_string, split_content_and_sources,
+    is_short_on_time, get_remaining_time, get_section_titles, match_analyst_stock, is_geopolitical
+)
+from ..utils.blobs import blob_store
+from ..utils.hedging import hedger
+from .prefetch import prefetcher
+from .scheduling import scheduler
+from .digest import digests
+from .runs import runs
+from .prompts import (
+    analyst_prompt, question_prompt, research_query_prompt, answer_prompt, section_prompt,
+    writer_prompt, digest_prompt, prompt_cache_stats, REPORT_TASK, INTRODUCTION_TASK, CONCLUSION_TASK
+)
+from ..utils.citations import consolidate_sections, split_sources, finalize_citations, format_sources
 
 
+logger = logging.getLogger(__name__)
+
 # Initialize the language model
 llm = ChatOpenAI(
     model=DEFAULT_MODEL,
@@ -24,180 +46,51 @@ llm = ChatOpenAI(
 # Initialize the search engine
 search_engine = SearchEngine()
 
-# Instruction templates
-ANALYST_INSTRUCTIONS = (
-    "For the topic 'Stocks from Brazil', create one analyst for each stock in: {stocks}, for each analyst give a clear focus on one stcok, do it for each stock in the list  "
-    "and one geopolitical analyst for all stocks. "
-    "IMPORTANT: Create only one analyst for each stock, do not create more than one analyst for the same stock."
-    "IMPORTANT: The total number of analysts must be equal to the number of stocks plus one for the geopolitical analyst."
-    "Each analyst must have the following fields:\n"
-    "- name: a realistic full name\n"
-    "- affiliation: a plausible company, bank, or institution\n"
-    "- role: a job title (e.g., Equity Analyst, Geopolitical Analyst)\n"
-    "- description: a short professional background and their focus regarding the stock(s)\n"
-    "Return the result as a list of analyst objects, using the exact field names above."
-)
-
-QUESTION_INSTRUCTIONS = """You are an analyst tasked with asking questions to a specialist to produce a comprehensive report about a specific Brazilian stock.
-
-Have in mind today's date is {current_date}, and use recent information.
-
-Your goal is to extract all relevant and important insights for a stockholder or potential buyer, including:
-- Price forecasts
-- Geopolitical factors
-- Recent news
-- Any other information that could impact the stock's value or investment decision
-
-Here is your persona, embody this character: {goals}
-
-Start by introducing yourself using a name that fits your persona, then ask your question.
-
-Continue asking questions to deepen and refine your understanding of the stock.
-
-When you are satisfied with your understanding, conclude the interview with: "Thank you very much for your help!"
-
-Remember to stay in character throughout your response, reflecting the persona and goals provided to you.
-
-"""
-
-RESEARCH_QUERY_INSTRUCTIONS = """You will receive a conversation between an analyst and a specialist about a Brazilian stock.
-
-Have in mind today's date is {current_date}, and use recent information.
-
-Your goal is to generate a well-structured query for use in retrieval and/or web research related to the conversation.
-
-First, analyze the complete conversation.
-
-Pay special attention to the last question asked by the analyst.
-
-Convert this final question into a well-structured web search query, focusing on price forecasts, geopolitical factors, news, and any other information relevant to stockholders or potential buyers."""
-
-ANSWER_INSTRUCTIONS = """You are a specialist being interviewed by an analyst, first of all.
-
-Here is the analyst's area of focus: {goals}. 
-
-Your goal is to answer a question posed by the interviewer, providing a comprehensive report for a Brazilian stock, including price forecasts, geopolitical factors, news, and all information relevant to a stockholder or potential buyer.
-
-To answer the question, use this context:
-
-{context}
-
-When answering the questions, follow these guidelines:
-
-1. Use only the information provided in the context. 
-2. Do not introduce external information or make assumptions beyond what is explicitly stated in the context.
-3. The context contains sources at the top of each individual document.
-4. Include these sources in your answer next to any relevant statements. For example, for source no. 1, use [1]. 
-5. List your sources in order at the bottom of your answer. [1] Source 1, [2] Source 2, etc.
-6. If the source is: <Document source="assistant/docs/llama3_1.pdf" page="7"/>', then just list: 
-
-[1] assistant/docs/llama3_1.pdf, page 7 
-
-And skip adding the brackets, as well as the Document source preamble in your citation.
-
-
-"""
-
-SECTION_WRITER_INSTRUCTIONS = """You are a financial technical writer specializing in Brazilian stocks.
-
-Your task is to create a concise, actionable, and well-structured section of a stock report based on a set of source documents about a specific Brazilian stock.
-
-**Instructions:**
-
-1. **Analyze the source documents:**  
-   - Each document begins with a <Document tag and may include a URL or file path.
-   - Focus on extracting insights that matter to investors: price forecasts, recent news, geopolitical and macroeconomic factors, risks, opportunities, and anything that could impact the stock's value.
-
-2. **Structure your report using markdown:**  
-   - Use ## for the section title (make it specific and engaging, e.g., "PETR4: 2024 Outlook and Key Drivers")
-   - Use ### for subsections
-
-3. **Report content:**  
-   a. **Title** (## header):  
-      - Use the stock ticker and a short, informative phrase.
-   b. **Summary** (### header):  
-      - Briefly introduce the stock and its context in the Brazilian market.
-      - Highlight the most important findings: price targets, analyst consensus, recent performance, and any major news or events.
-      - Clearly state any risks or opportunities identified.
-      - Use bullet points or a short numbered list for clarity if needed.
-   c. **Key Insights** (### header):  
-      - List and explain the most relevant insights for a stockholder or potential buyer, such as:
-        - Price forecasts and valuation
-        - Geopolitical or macroeconomic factors
-        - Regulatory changes
-        - Company-specific news or events
-        - Analyst recommendations
-
-   d. **Sources** (### header):  
-      - List all sources used in your report.
-      - For each source, provide the full link (URL) or document path.
-      - Use a numbered list ([1], [2], etc.) and avoid duplicates.
-      - Example:
-        [1] https://www.b3.com.br/en_us/
-        [2] https://www.valorinveste.globo.com/
-      - Only include sources that were actually referenced in the summary or key insights.
-
-4. **General guidelines:**  
-   - Do not mention the names of interviewers or specialists.
-   - Keep the section under 400 words.
-   - Do not include a preamble before the report title.
-   - Ensure the report is clear, actionable, and relevant for investors interested in the stock.
-"""
-
-REPORT_WRITER_INSTRUCTIONS = """You are a financial technical writer creating a consolidated report on the following topic:
-
-{topic}
-
-You have a team of analysts. Each analyst has:
-1. Conducted an interview with a specialist about a specific stock or a relevant macro/geopolitical factor.
-2. Written their findings in a memo.
-
-Your task:
 
-1. You will receive a collection of memos from your analysts.
-2. Carefully analyze the insights from each memo, focusing on actionable information for stockholders or potential buyers: price forecasts, recent news, geopolitical and macroeconomic factors, risks, opportunities, and anything that could impact the stock's value.
-3. Consolidate the main points from all memos into a single, cohesive, and actionable narrative.
-4. Summarize the most important findings, connecting the core ideas from all memos.
-5. Do not write a conclusion, nor a summary, just a report.
-
-**Formatting:**
-- Use markdown formatting.
-- Do not include a preamble for the report.
-- Do not use subheadings except as specified below.
-- Start your report with a single title header: ## Stock Insights
-- Do not mention analyst names in your report.
-- Preserve any citations in the memos, which will be annotated in brackets, e.g. [1] or [2].
-- Create a final consolidated list of sources and add it to a Sources section with the header ## Sources.
-- List your sources in order and do not repeat them.
-- Example:
-[1] https://www.b3.com.br/en_us/
-[2] https://www.valorinveste.globo.com/
-
-Here are the memos from your analysts to build your report: 
-
-{context}"""
-
-INTRO_CONCLUSION_INSTRUCTIONS = """You are a financial technical writer finalizing a report on {topic}
-
-You will receive all the sections of the report.
-
-Your job is to write a concise and compelling introduction or conclusion, focused on the stock context.
-
-The user will instruct you whether to write the introduction or the conclusion.
-
-Do not include a preamble for any section.
-
-Aim for about 100 words, concisely presenting (for the introduction) or recapping (for the conclusion) all sections of the report.
-
-Use markdown formatting. 
-
-For your introduction, create an engaging title and use the # header for the title.
+def slot_timeout(state: Dict[str, Any]) -> Optional[float]:
+    """
+    Longest a call may wait for a scheduler slot: until the run's deadline (no limit without one).
+    """
+    remaining = get_remaining_time(state)
+    return None if remaining is None else max(0.0, remaining)
 
-For your introduction, use ## Introduction as the section header. 
 
-For your conclusion, use ## Conclusion as the section header.
+def invoke_llm(state: Dict[str, Any], node: str, model, messages: List[Any]):
+    """
+    Invokes a model within the run's fair share of LLM slots, hedged if enabled for the node.
+    Raises `RunCancelled` once the run has been cancelled.
+    """
+    run_id = state.get("run_id")
+    runs.check(run_id)
+    with scheduler.llm(run_id, slot_timeout(state)):
+        # The run may have been cancelled while waiting for a slot
+        runs.check(run_id)
+        result = hedger.call(node, lambda: model.invoke(messages), lambda: scheduler.reserve_llm(run_id))
+
+    # Structured output requested with include_raw=True: record the raw message's usage, return the object
+    if isinstance(result, dict) and "parsed" in result:
+        prompt_cache_stats.record(node, result["raw"])
+        if result.get("parsing_error") is not None:
+            raise result["parsing_error"]
+        return result["parsed"]
+    prompt_cache_stats.record(node, result)
+    return result
+
+
+def scheduled_search(state: Dict[str, Any], query: str) -> str:
+    """
+    Returns the cached result for a query, or searches within the run's fair share of search slots.
+    Raises `RunCancelled` once the run has been cancelled.
+    """
+    run_id = state.get("run_id")
+    runs.check(run_id)
+    cached = search_engine.cached(query)
+    if cached is not None:
+        return cached
+    with scheduler.search(run_id, slot_timeout(state)):
+        runs.check(run_id)
+        return hedger.call("search", lambda: search_engine.search(query), lambda: scheduler.reserve_search(run_id))
 
-Here are the sections to reflect on when writing: {formatted_str_sections}"""
 
 def create_analysts(state: AnalystGenerationState) -> Dict[str, Any]:
     """
@@ -206,19 +99,15 @@ def create_analysts(state: AnalystGenerationState) -> Dict[str, Any]:
     """
     stocks = state.get('stocks', [])
 
-    # Prepares the system prompt with topic and stocks
-    system_message = ANALYST_INSTRUCTIONS.format(
-        stocks=", ".join(stocks)
-    )
+    # Baseline searches run while the analysts are being generated
+    if SPECULATIVE_PREFETCH and state.get("run_id"):
+        run_id = state["run_id"]
+        prefetcher.start(run_id, stocks, lambda query: scheduled_search(state, query))
 
-    structured_llm = llm.with_structured_output(Perspectives)
+    structured_llm = llm.with_structured_output(Perspectives, include_raw=True)
 
     # Generates analysts
-    analysts = structured_llm.invoke([
-        SystemMessage(content=system_message),
-        HumanMessage(
-            content="Generate the set of analysts as structured output.")
-    ])
+    analysts = invoke_llm(state, "create_analysts", structured_llm, analyst_prompt(stocks))
 
     # Filter and validate analysts
     filtered_analysts = []
@@ -227,7 +116,7 @@ def create_analysts(state: AnalystGenerationState) -> Dict[str, Any]:
 
     for analyst in analysts.analysts:
         # Check if it's a geopolitical analyst
-        if "geopolitical" in analyst.role.lower():
+        if is_geopolitical(analyst):
             if geo_analyst is None:  # Only keep the first geopolitical analyst
                 geo_analyst = analyst
                 filtered_analysts.append(analyst)
@@ -256,9 +145,7 @@ def generate_question(state: InterviewState) -> Dict[str, Any]:
     messages = state["messages"]
 
     # Generates question using the analyst's persona
-    system_message = QUESTION_INSTRUCTIONS.format(
-        goals=analyst.persona, current_date=CURRENT_DATE)
-    question = llm.invoke([SystemMessage(content=system_message)] + messages)
+    question = invoke_llm(state, "generate_question", llm, question_prompt(analyst.persona, messages))
 
     return {"messages": [question]}
 
@@ -269,16 +156,33 @@ def web_search(state: InterviewState) -> Dict[str, Any]:
     """
     messages = state['messages']
 
+    # First round of a stock interview: use the speculatively prefetched baseline search
+    if not state.get("context") and state.get("stock") and state.get("run_id"):
+        remaining = get_remaining_time(state)
+        wait = PREFETCH_WAIT_SECONDS if remaining is None else max(0.0, min(PREFETCH_WAIT_SECONDS, remaining))
+        prefetched = prefetcher.take(state["run_id"], state["stock"], timeout=wait)
+        if prefetched is not None:
+            return {"context": [blob_store.put(prefetched, state["run_id"])]}
+
+    # Close to the deadline: no new search, answer from the context gathered so far
+    if is_short_on_time(state, DEADLINE_FINAL_STAGE_SECONDS) and state.get("context"):
+        logger.info("Deadline close, skipping web search")
+        return {"context": []}
+
+    if is_short_on_time(state, DEADLINE_SEARCH_SECONDS):
+        # Use the analyst's question directly instead of an LLM-generated query, preferring a cached result
+        query = messages[-1].content[:300]
+        search_result = scheduled_search(state, query)
+        return {"context": [blob_store.put(search_result, state.get("run_id"))]}
+
     # Generates search query
-    structured_llm = llm.with_structured_output(ResearchQuery)
-    research_query = structured_llm.invoke([
-        SystemMessage(content=RESEARCH_QUERY_INSTRUCTIONS)
-    ] + messages)
+    structured_llm = llm.with_structured_output(ResearchQuery, include_raw=True)
+    research_query = invoke_llm(state, "web_search", structured_llm, research_query_prompt(messages))
 
     # Executes the search
-    search_result = search_engine.search(research_query.research_query)
+    search_result = scheduled_search(state, research_query.research_query)
 
-    return {"context": [search_result]}
+    return {"context": [blob_store.put(search_result, state.get("run_id"))]}
 
 
 def generate_answer(state: InterviewState) -> Dict[str, Any]:
@@ -287,16 +191,10 @@ def generate_answer(state: InterviewState) -> Dict[str, Any]:
     """
     analyst = state["analyst"]
     messages = state["messages"]
-    context = state["context"]
+    context = blob_store.get_many(state["context"])
 
     # Responds using the context information (Tavily)
-    system_message = ANSWER_INSTRUCTIONS.format(
-        goals=analyst.persona,
-        context=context,
-        current_date=CURRENT_DATE
-    )
-
-    answer = llm.invoke([SystemMessage(content=system_message)] + messages)
+    answer = invoke_llm(state, "generate_answer", llm, answer_prompt(analyst.persona, context, messages))
 
     # Marks the message as coming from the specialist
     answer.name = "specialist"
@@ -313,7 +211,7 @@ def save_interview(state: InterviewState) -> Dict[str, Any]:
     # Converts the interview to string
     interview = get_buffer_string(messages)
 
-    return {"interview": interview}
+    return {"interview": blob_store.put(interview, state.get("run_id"))}
 
 def route_messages(state: InterviewState, name: str = "specialist") -> str:
     """
@@ -334,6 +232,11 @@ def route_messages(state: InterviewState, name: str = "specialist") -> str:
         print("Max turns reached, ending interview")
         return 'save_interview'
 
+    # End if another turn would not leave time for the section and final writers
+    if is_short_on_time(state, DEADLINE_TURN_SECONDS + DEADLINE_FINAL_STAGE_SECONDS):
+        logger.info("Deadline approaching, ending interview")
+        return 'save_interview'
+
     # Check if the last question signals the end
     if len(messages) >= 2:
         last_question = messages[-2]
@@ -347,25 +250,58 @@ def route_messages(state: InterviewState, name: str = "specialist") -> str:
 
 def write_section(state: InterviewState):
     """Node to write a report section based on the interview"""
-    interview = state["interview"]
-    context = state["context"]
+    context = blob_store.get_many(state["context"])
     analyst = state["analyst"]
 
+    # Write a shorter section when the deadline is close
+    max_words = 200 if is_short_on_time(state, DEADLINE_SHORT_SECTION_SECONDS) else 400
+
     # Write section based on the interview documents
-    system_message = SECTION_WRITER_INSTRUCTIONS.format(
-        focus=analyst.description)
-    section = llm.invoke([
-        SystemMessage(content=system_message),
-        HumanMessage(
-            content=f"Use this source to write your section: {context}")
-    ])
+    section = invoke_llm(state, "write_section", llm, section_prompt(analyst.description, max_words, context))
+
+    ref = blob_store.put(section.content, state.get("run_id"))
+
+    # Recorded outside the checkpoint, for a partial report if the run hits its deadline
+    runs.add_section(state.get("run_id"), ref)
+
+    # Large runs merge sections into a digest while the other interviews are still running
+    digests.add(state.get("run_id"), ref, section.content)
 
-    return {"sections": [section.content]}
+    return {"sections": [ref]}
+
+
+def merge_sections(run_id: Optional[str], texts: List[str], deadline: Optional[float] = None) -> str:
+    """Merge section bodies (or earlier digests) into one digest for the final writers"""
+    # Like the run's other calls, a merge waits for an LLM slot at most until the deadline
+    digest = invoke_llm({"run_id": run_id, "deadline": deadline}, "merge_sections", llm, digest_prompt(format_sections_string(texts)))
+    return digest.content
+
+
+def route_start(state: ResearchGraphState):
+    """Skip analyst creation and interviews when every section was pre-warmed"""
+    if state.get("stocks"):
+        return "create_analysts"
+    return ["write_report", "write_introduction", "write_conclusion"]
 
 
 def start_all_interviews(state: ResearchGraphState):
     """Start interviews in parallel for each analyst"""
     topic = state["topic"]
+    stocks = state.get("stocks", [])
+    covered = [(analyst, match_analyst_stock(analyst, stocks)) for analyst in state["analysts"]]
+
+    # Cancel prefetched searches for stocks no analyst covers
+    if state.get("run_id"):
+        prefetcher.retain(state["run_id"], [stock for _, stock in covered if stock])
+
+    # Large runs: reduce sections incrementally as interviews finish (pre-warmed sections right away)
+    existing = state.get("sections", [])
+    if state.get("incremental_reduce", INCREMENTAL_REDUCE) and state.get("run_id") and len(covered) + len(existing) >= INCREMENTAL_REDUCE_MIN_SECTIONS:
+        run_id, deadline = state["run_id"], state.get("deadline")
+        digest = digests.start(run_id, lambda texts: merge_sections(run_id, texts, deadline), deadline)
+        for ref in existing:
+            digest.add(ref, blob_store.get(ref))
+
     return [
         Send("conduct_interview", {
             "analyst": analyst,
@@ -375,120 +311,128 @@ def start_all_interviews(state: ResearchGraphState):
             "context": [],
             "max_num_turns": 2,
             "interview": "",
-            "sections": []
-        }) for analyst in state["analysts"]
+            "sections": [],
+            "deadline": state.get("deadline"),
+            "run_id": state.get("run_id"),
+            "stock": stock
+        }) for analyst, stock in covered
     ]
 
 
-def write_report(state: ResearchGraphState):
-    """Generate the main report from the analysts' sections"""
-    sections = state["sections"]
-    topic = state["topic"]
+def template_introduction(topic: str, sections: List[str]) -> str:
+    """Introduction built without the LLM, used when the deadline leaves no time to write one"""
+    covered = "\n".join(f"- {title}" for title in get_section_titles(sections))
+    return f"# {topic}\n\n## Introduction\n\nThis report covers the following topics:\n\n{covered}"
 
-    # Concatenate all sections
-    formatted_sections_str = "\n\n".join(
-        [f"{section}" for section in sections])
 
-    # Generate the final report consolidating the sections
-    system_message = REPORT_WRITER_INSTRUCTIONS.format(
-        topic=topic, context=formatted_sections_str)
-    report = llm.invoke([
-        SystemMessage(content=system_message),
-        HumanMessage(content=f"Write a report based on these memos.")
-    ])
+def template_conclusion(sections: List[str]) -> str:
+    """Conclusion built without the LLM, used when the deadline leaves no time to write one"""
+    return ("## Conclusion\n\nThe sections above summarize the most relevant findings for each stock "
+            f"analyzed ({len(sections)} sections). Review the cited sources before making investment decisions.")
 
-    return {"content": report.content}
 
+def writer_inputs(state: Dict[str, Any], wait: Optional[float] = None):
+    """
+    Returns the final writers' context parts, the section bodies and the global source list.
 
+    With an incremental digest the parts are digests plus the sections not merged yet;
+    otherwise they are the section bodies. Citations are numbered against the source list.
+    """
+    refs = state.get("sections", [])
+    digest = digests.get(state.get("run_id"))
+    if digest is None:
+        bodies, sources = consolidate_sections(blob_store.get_many(refs))
+        return bodies, bodies, sources
+    remaining = get_remaining_time(state)
+    if wait is None:
+        wait = DIGEST_WAIT_SECONDS if remaining is None else min(DIGEST_WAIT_SECONDS, remaining - DEADLINE_WRITER_SECONDS)
+    snapshot = digest.snapshot(zip(refs, blob_store.get_many(refs)), wait)
+    return snapshot.parts, snapshot.bodies, snapshot.sources
+
+
+def assemble_partial_report(state: Dict[str, Any]) -> Optional[str]:
+    """Assemble a report from whatever sections exist when a run hits its deadline"""
+    if state.get("final_report"):
+        return state["final_report"]
+    if not state.get("sections"):
+        return None
+    _, bodies, sources = writer_inputs(state, wait=0)
+    return finalize_report({
+        "introduction": state.get("introduction") or template_introduction(state.get("topic", "Stock Report"), bodies),
+        "content": state.get("content") or format_sections_string(bodies),
+        "conclusion": state.get("conclusion") or template_conclusion(bodies),
+        "sources": state.get("sources") or sources,
+    })["final_report"]
 
 
 def write_report(state: ResearchGraphState):
     """Generate the main report from the analysts' sections"""
-    sections = state["sections"]
     topic = state["topic"]
 
-    # Concatenate all sections
-    formatted_sections_str = "\n\n".join(
-        [f"{section}" for section in sections])
+    # Sections (or their digest) with citations renumbered globally and no per-section source lists
+    parts, bodies, sources = writer_inputs(state)
 
-    # Generate the final report consolidating the sections
-    system_message = REPORT_WRITER_INSTRUCTIONS.format(
-        topic=topic, context=formatted_sections_str)
-    report = llm.invoke([
-        SystemMessage(content=system_message),
-        HumanMessage(content=f"Write a report based on these memos.")
-    ])
+    # Out of time: the consolidated sections are the report
+    if is_short_on_time(state, DEADLINE_WRITER_SECONDS):
+        return {"content": format_sections_string(bodies), "sources": sources}
 
-    return {"content": report.content}
+    # Generate the final report consolidating the sections (same prompt prefix as the other writers)
+    report = invoke_llm(state, "write_report", llm, writer_prompt(topic, format_sections_string(parts), REPORT_TASK))
+
+    return {"content": report.content, "sources": sources}
 
 
 def write_introduction(state: ResearchGraphState):
     """Generate introduction for the report"""
-    sections = state["sections"]
     topic = state["topic"]
 
-    # Concatenate all sections
-    formatted_sections_str = "\n\n".join(
-        [f"{section}" for section in sections])
+    # Sections (or their digest) with citations renumbered globally and no per-section source lists
+    parts, bodies, _ = writer_inputs(state)
+    formatted_sections_str = format_sections_string(parts)
 
-    # Generate introduction
-    instructions = INTRO_CONCLUSION_INSTRUCTIONS.format(
-        topic=topic,
-        formatted_str_sections=formatted_sections_str
-    )
+    if is_short_on_time(state, DEADLINE_WRITER_SECONDS):
+        return {"introduction": template_introduction(topic, bodies)}
 
-    intro = llm.invoke([
-        SystemMessage(content=instructions),
-        HumanMessage(content=f"Write the introduction of the report")
-    ])
+    # Generate introduction (same prompt prefix as the other writers)
+    intro = invoke_llm(state, "write_introduction", llm,
+                       writer_prompt(topic, formatted_sections_str, INTRODUCTION_TASK))
 
     return {"introduction": intro.content}
 
 
 def write_conclusion(state: ResearchGraphState):
     """Generate conclusion for the report"""
-    sections = state["sections"]
     topic = state["topic"]
 
-    # Concatenate all sections
-    formatted_sections_str = "\n\n".join(
-        [f"{section}" for section in sections])
+    # Sections (or their digest) with citations renumbered globally and no per-section source lists
+    parts, bodies, _ = writer_inputs(state)
+    formatted_sections_str = format_sections_string(parts)
 
-    # Generate conclusion
-    instructions = INTRO_CONCLUSION_INSTRUCTIONS.format(
-        topic=topic,
-        formatted_str_sections=formatted_sections_str
-    )
+    if is_short_on_time(state, DEADLINE_WRITER_SECONDS):
+        return {"conclusion": template_conclusion(bodies)}
 
-    conclusion = llm.invoke([
-        SystemMessage(content=instructions),
-        HumanMessage(content=f"Write the conclusion of the report")
-    ])
+    # Generate conclusion (same prompt prefix as the other writers)
+    conclusion = invoke_llm(state, "write_conclusion", llm,
+                            writer_prompt(topic, formatted_sections_str, CONCLUSION_TASK))
 
     return {"conclusion": conclusion.content}
 
 
 def finalize_report(state: ResearchGraphState):
     """Join all parts of the report (introduction, content, conclusion)"""
-    content = state["content"]
-
-    # Process the content
-    if content.startswith("## Stock Insights"):
-        content = content.strip("## Stock Insights")
+    content = state["content"].strip()
 
-    if "## Sources" in content:
-        try:
-            content, sources = content.split("\n## Sources\n")
-        except:
-            sources = None
-    else:
-        sources = None
+    # Process the content; drop any Sources list the model wrote despite the instructions
+    content = content.removeprefix("## Stock Insights").strip()
+    content, _ = split_sources(content)
 
     # Assemble the final report
     final_report = state["introduction"] + "\n\n---\n\n" + \
         content + "\n\n---\n\n" + state["conclusion"]
 
-    # Add sources if they exist
+    # Keep only the cited sources, numbered by first appearance
+    final_report, cited = finalize_citations(final_report, state.get("sources", []))
+    sources = format_sources(cited)
     if sources is not None:
         final_report += "\n\n## Sources\n" + sources
 
@@ -0,0 +1,117 @@
+"""
+Speculative prefetch of baseline per-ticker searches.
+
+The tickers are known when a run starts, but interviews only begin after
+`create_analysts` returns. Baseline searches are fired in the background while the
+analysts are generated; each interview then uses its ticker's result as the first
+round of context instead of generating a query and searching. Prefetches that no
+interview claims are cancelled.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ..config import PREFETCH_MAX_WORKERS, PREFETCH_QUERY_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativePrefetcher:
+    """
+    Runs baseline searches in the background, keyed by run and ticker.
+    """
+
+    def __init__(self, max_workers: int = PREFETCH_MAX_WORKERS):
+        """
+        Initializes the prefetcher.
+
+        Args:
+            max_workers: Maximum number of searches running at the same time across all runs
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending: Dict[str, Dict[str, Future]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+
+    def start(self, run_id: str, stocks: List[str], search: Callable[[str], str]) -> None:
+        """
+        Fires a baseline search for each stock of a run.
+
+        Args:
+            run_id: Identifier of the run
+            stocks: Tickers to search for
+            search: Function performing a search and returning formatted documents
+        """
+        futures = {
+            stock: self._executor.submit(search, PREFETCH_QUERY_TEMPLATE.format(stock=stock))
+            for stock in stocks
+        }
+        with self._lock:
+            self._pending.setdefault(run_id, {}).update(futures)
+
+    def take(self, run_id: str, stock: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Claims the prefetched result for a stock, waiting for it if it is still running.
+
+        Args:
+            run_id: Identifier of the run
+            stock: Ticker
+            timeout: Maximum seconds to wait for a running search
+
+        Returns:
+            str | None: Formatted search results, or None if nothing usable was prefetched
+        """
+        with self._lock:
+            future = self._pending.get(run_id, {}).pop(stock, None)
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            result = None
+        except Exception as e:
+            logger.warning(f"Prefetch for {stock} failed: {e}")
+            result = None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def retain(self, run_id: str, stocks: Iterable[str]) -> None:
+        """
+        Cancels the prefetches of a run that no interview will claim.
+        """
+        keep = set(stocks)
+        with self._lock:
+            pending = self._pending.get(run_id, {})
+            unused = [stock for stock in pending if stock not in keep]
+            futures = [pending.pop(stock) for stock in unused]
+        self._cancel(futures)
+
+    def discard(self, run_id: str) -> None:
+        """
+        Cancels everything left for a run. Searches already running finish and are dropped.
+        """
+        with self._lock:
+            futures = list(self._pending.pop(run_id, {}).values())
+        self._cancel(futures)
+
+    def _cancel(self, futures: List[Future]) -> None:
+        cancelled = sum(1 for future in futures if future.cancel())
+        with self._lock:
+            self.cancelled += cancelled
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cancelled": self.cancelled,
+                    "pending_runs": len(self._pending)}
+
+
+# Process-wide prefetcher shared by all runs
+prefetcher = SpeculativePrefetcher()
@@ -0,0 +1,306 @@
+"""
+Off-peak pre-warming of per-ticker report sections.
+
+A scheduler runs the interview subgraph for every ticker in a configured watchlist
+before market open and stores the resulting sections with a freshness timestamp.
+Live requests whose tickers all have fresh sections then skip straight to the
+report writers.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the scheduler then runs in every process
+    fcntl = None
+
+from ..config import (
+    PREWARM_WATCHLIST, PREWARM_AT, PREWARM_UTC_OFFSET_HOURS, PREWARM_MAX_CONCURRENCY,
+    PREWARM_DAILY_BUDGET, PREWARM_SECTION_TTL_SECONDS, PREWARM_DIR
+)
+from ..utils.blobs import blob_store
+from ..utils.helpers import match_analyst_stock, is_geopolitical
+from .nodes import create_analysts, start_all_interviews
+from .digest import digests
+from .prefetch import prefetcher
+from .scheduling import scheduler, BATCH
+from .agent.graph import create_interview_graph
+
+logger = logging.getLogger(__name__)
+
+GEOPOLITICAL_KEY = "__geopolitical__"
+PREWARM_TENANT = "prewarm"
+
+
+class SectionStore:
+    """
+    File-backed store of pre-warmed sections, shared by all worker processes.
+    """
+
+    def __init__(self, directory: str = PREWARM_DIR, ttl_seconds: int = PREWARM_SECTION_TTL_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initializes the section store.
+
+        Args:
+            directory: Directory where sections are stored
+            ttl_seconds: Age after which a section is no longer considered fresh
+            clock: Returns the current time as a Unix timestamp
+        """
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".json")
+
+    def save(self, key: str, section: str) -> None:
+        """
+        Stores a section with the current time as its freshness timestamp.
+
+        Args:
+            key: Ticker, or GEOPOLITICAL_KEY for the geopolitical section
+            section: Section in Markdown
+        """
+        # Created on first write, so importing the store has no side effects
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "section": section, "created_at": self.clock()}, f)
+        os.replace(tmp_path, path)
+
+    def get_fresh(self, key: str) -> Optional[str]:
+        """
+        Returns a stored section if it is still fresh.
+
+        Args:
+            key: Ticker, or GEOPOLITICAL_KEY
+
+        Returns:
+            str | None: Section, or None if missing or stale
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.clock() - entry.get("created_at", 0) > self.ttl_seconds:
+            return None
+        return entry.get("section")
+
+    def lookup(self, stocks: List[str]) -> Dict[str, str]:
+        """
+        Returns the fresh sections available for the given stocks, keyed by ticker.
+        """
+        found = {}
+        for stock in stocks:
+            section = self.get_fresh(stock)
+            if section is not None:
+                found[stock] = section
+        return found
+
+
+def prewarm_sections(tickers: List[str], store: SectionStore, max_concurrency: int = PREWARM_MAX_CONCURRENCY,
+                     topic: str = "Brazilian Stock Research") -> int:
+    """
+    Runs the interview subgraph for each ticker (plus one geopolitical analyst) and stores the sections.
+
+    Args:
+        tickers: Tickers to pre-warm
+        store: Store receiving the sections
+        max_concurrency: Maximum number of interviews running at the same time
+        topic: Research topic
+
+    Returns:
+        int: Number of interviews that produced a section
+    """
+    # Pre-warming is batch work, scheduled behind live interactive requests
+    run_id = f"prewarm-{uuid.uuid4()}"
+    scheduler.register(run_id, PREWARM_TENANT, BATCH)
+    try:
+        analysts = create_analysts({"stocks": tickers, "run_id": run_id})["analysts"]
+        interview_graph = create_interview_graph()
+
+        # Sections are stored one by one, there is no final report to digest them for
+        jobs = []
+        for send in start_all_interviews({"topic": topic, "analysts": analysts, "run_id": run_id,
+                                          "incremental_reduce": False}):
+            analyst = send.arg["analyst"]
+            if is_geopolitical(analyst):
+                jobs.append((GEOPOLITICAL_KEY, send.arg))
+            else:
+                stock = match_analyst_stock(analyst, tickers)
+                if stock:
+                    jobs.append((stock, send.arg))
+
+        def run(job) -> bool:
+            key, interview_input = job
+            try:
+                result = interview_graph.invoke(interview_input)
+                store.save(key, blob_store.get(result["sections"][-1]))
+                logger.info(f"Pre-warmed section for {key}")
+                return True
+            except Exception as e:
+                logger.error(f"Error pre-warming section for {key}: {e}", exc_info=True)
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            return sum(executor.map(run, jobs))
+    finally:
+        prefetcher.discard(run_id)
+        digests.discard(run_id)
+        scheduler.unregister(run_id)
+        blob_store.release(run_id)
+
+
+class PrewarmScheduler:
+    """
+    In-process daily scheduler for section pre-warming.
+
+    Time is read from an injectable clock, so `tick()` can be driven by a fake clock in tests.
+    """
+
+    def __init__(self, watchlist: List[str] = PREWARM_WATCHLIST, run_at: str = PREWARM_AT,
+                 utc_offset_hours: int = PREWARM_UTC_OFFSET_HOURS,
+                 max_concurrency: int = PREWARM_MAX_CONCURRENCY, daily_budget: int = PREWARM_DAILY_BUDGET,
+                 store: Optional[SectionStore] = None, clock: Callable[[], float] = time.time,
+                 runner: Callable[..., int] = prewarm_sections):
+        """
+        Initializes the scheduler.
+
+        Args:
+            watchlist: Tickers to pre-warm
+            run_at: Local time of day (HH:MM) at which to refresh sections
+            utc_offset_hours: Offset of the local timezone from UTC
+            max_concurrency: Maximum number of interviews running at the same time
+            daily_budget: Maximum number of interviews per local day (the geopolitical one included)
+            store: Store receiving the sections
+            clock: Returns the current time as a Unix timestamp
+            runner: Function that generates and stores sections for a list of tickers
+        """
+        self.watchlist = watchlist
+        hour, minute = (int(part) for part in run_at.split(":"))
+        self.run_at = (hour, minute)
+        self.tz = timezone(timedelta(hours=utc_offset_hours))
+        self.max_concurrency = max_concurrency
+        self.daily_budget = daily_budget
+        self.clock = clock
+        self.store = store or SectionStore(clock=clock)
+        self.runner = runner
+        self._spent: Dict[str, int] = {}
+        self._next_run = self.next_run_after(clock())
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_run_after(self, now: float) -> float:
+        """
+        Returns the first scheduled run time strictly after `now`.
+        """
+        local_now = datetime.fromtimestamp(now, self.tz)
+        candidate = local_now.replace(hour=self.run_at[0], minute=self.run_at[1], second=0, microsecond=0)
+        if candidate.timestamp() <= now:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+    def _day(self, now: float) -> str:
+        return datetime.fromtimestamp(now, self.tz).strftime("%Y-%m-%d")
+
+    def remaining_budget(self, now: Optional[float] = None) -> int:
+        """
+        Returns how many interviews can still be run today.
+        """
+        now = self.clock() if now is None else now
+        return max(0, self.daily_budget - self._spent.get(self._day(now), 0))
+
+    def run_once(self) -> int:
+        """
+        Refreshes stale sections of the watchlist within today's budget.
+
+        Returns:
+            int: Number of sections generated
+        """
+        now = self.clock()
+        stale = [ticker for ticker in self.watchlist if self.store.get_fresh(ticker) is None]
+        if not stale:
+            logger.info("Pre-warm: all watchlist sections are fresh")
+            return 0
+        # One interview per ticker plus the geopolitical one
+        budget = self.remaining_budget(now) - 1
+        if budget <= 0:
+            logger.warning("Pre-warm: daily budget exhausted, skipping run")
+            return 0
+        tickers = stale[:budget]
+        if len(tickers) < len(stale):
+            logger.warning(f"Pre-warm: budget allows {len(tickers)} of {len(stale)} stale tickers")
+        day = self._day(now)
+        self._spent[day] = self._spent.get(day, 0) + len(tickers) + 1
+        self._spent = {day: self._spent[day]}
+        logger.info(f"Pre-warming sections for: {', '.join(tickers)}")
+        return self.runner(tickers, self.store, self.max_concurrency)
+
+    def tick(self) -> bool:
+        """
+        Runs the pre-warm job if it is due.
+
+        Returns:
+            bool: True if the job ran
+        """
+        now = self.clock()
+        if now < self._next_run:
+            return False
+        self._next_run = self.next_run_after(now)
+        try:
+            self.run_once()
+        except Exception as e:
+            logger.error(f"Pre-warm run failed: {e}", exc_info=True)
+        return True
+
+    def seconds_until_next_run(self) -> float:
+        """Returns the number of seconds until the next scheduled run."""
+        return max(0.0, self._next_run - self.clock())
+
+    def start(self) -> bool:
+        """
+        Starts the scheduler in a daemon thread. Only one process per section directory runs it.
+
+        Returns:
+            bool: True if this process started the scheduler
+        """
+        if not self.watchlist or self._thread is not None:
+            return False
+        if fcntl is not None:
+            os.makedirs(self.store.directory, exist_ok=True)
+            self._lock_file = open(os.path.join(self.store.directory, ".prewarm.lock"), "w")
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                logger.info("Pre-warm scheduler already running in another process")
+                return False
+
+        def loop():
+            while not self._stop.is_set():
+                self.tick()
+                self._stop.wait(min(60.0, self.seconds_until_next_run()))
+
+        self._thread = threading.Thread(target=loop, name="prewarm-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Pre-warm scheduler started for {len(self.watchlist)} tickers, "
+                    f"next run at {datetime.fromtimestamp(self._next_run, self.tz).isoformat()}")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# Process-wide store used by live requests
+section_store = SectionStore()
@@ -0,0 +1,264 @@
+"""
+Prompt assembly for the graph nodes.
+
+Providers cache prompts by exact prefix, so every prompt is assembled in the same order:
+static instructions first, then data that changes slowly (today's date, the analyst's
+persona, the search context gathered so far, the report's sections), then per-call
+content (the conversation, the task). The three final writers share one prefix: the
+writer preamble plus the sections, followed by a short task message.
+
+The share of prompt tokens served from the provider's cache is recorded per node from
+the responses' usage metadata.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from ..config import DIGEST_MAX_WORDS, PREWARM_UTC_OFFSET_HOURS
+
+ANALYST_INSTRUCTIONS = (
+    "For the topic 'Stocks from Brazil', create one analyst for each stock in the list given by the user, "
+    "giving each analyst a clear focus on one stock, and one geopolitical analyst for all stocks. "
+    "IMPORTANT: Create only one analyst for each stock, do not create more than one analyst for the same stock. "
+    "IMPORTANT: The total number of analysts must be equal to the number of stocks plus one for the geopolitical analyst.\n"
+    "Each analyst must have the following fields:\n"
+    "- name: a realistic full name\n"
+    "- affiliation: a plausible company, bank, or institution\n"
+    "- role: a job title (e.g., Equity Analyst, Geopolitical Analyst)\n"
+    "- description: a short professional background and their focus regarding the stock(s)\n"
+    "Return the result as a list of analyst objects, using the exact field names above."
+)
+
+QUESTION_INSTRUCTIONS = """You are an analyst tasked with asking questions to a specialist to produce a comprehensive report about a specific Brazilian stock.
+
+Your goal is to extract all relevant and important insights for a stockholder or potential buyer, including:
+- Price forecasts
+- Geopolitical factors
+- Recent news
+- Any other information that could impact the stock's value or investment decision
+
+Start by introducing yourself using a name that fits your persona, then ask your question.
+
+Continue asking questions to deepen and refine your understanding of the stock.
+
+When you are satisfied with your understanding, conclude the interview with: "Thank you very much for your help!"
+
+Remember to stay in character throughout your response, reflecting the persona given below.
+
+Keep today's date (given below) in mind, and use recent information."""
+
+RESEARCH_QUERY_INSTRUCTIONS = """You will receive a conversation between an analyst and a specialist about a Brazilian stock.
+
+Your goal is to generate a well-structured query for use in retrieval and/or web research related to the conversation.
+
+First, analyze the complete conversation.
+
+Pay special attention to the last question asked by the analyst.
+
+Convert this final question into a well-structured web search query, focusing on price forecasts, geopolitical factors, news, and any other information relevant to stockholders or potential buyers.
+
+Keep today's date (given below) in mind, and look for recent information."""
+
+ANSWER_INSTRUCTIONS = """You are a specialist being interviewed by an analyst.
+
+Your goal is to answer the question posed by the interviewer, providing a comprehensive report for a Brazilian stock, including price forecasts, geopolitical factors, news, and all information relevant to a stockholder or potential buyer.
+
+The analyst's area of focus and the context to answer with are given below.
+
+When answering the questions, follow these guidelines:
+
+1. Use only the information provided in the context.
+2. Do not introduce external information or make assumptions beyond what is explicitly stated in the context.
+3. The context contains sources at the top of each individual document.
+4. Include these sources in your answer next to any relevant statements. For example, for source no. 1, use [1].
+5. List your sources in order at the bottom of your answer. [1] Source 1, [2] Source 2, etc.
+6. If the source is: <Document source="assistant/docs/llama3_1.pdf" page="7"/>', then just list:
+
+[1] assistant/docs/llama3_1.pdf, page 7
+
+And skip adding the brackets, as well as the Document source preamble in your citation."""
+
+SECTION_WRITER_INSTRUCTIONS = """You are a financial technical writer specializing in Brazilian stocks.
+
+Your task is to create a concise, actionable, and well-structured section of a stock report based on a set of source documents about a specific Brazilian stock.
+
+**Instructions:**
+
+1. **Analyze the source documents:**
+   - Each document begins with a <Document tag and may include a URL or file path.
+   - Focus on extracting insights that matter to investors: price forecasts, recent news, geopolitical and macroeconomic factors, risks, opportunities, and anything that could impact the stock's value.
+
+2. **Structure your report using markdown:**
+   - Use ## for the section title (make it specific and engaging, e.g., "PETR4: 2024 Outlook and Key Drivers")
+   - Use ### for subsections
+
+3. **Report content:**
+   a. **Title** (## header):
+      - Use the stock ticker and a short, informative phrase.
+   b. **Summary** (### header):
+      - Briefly introduce the stock and its context in the Brazilian market.
+      - Highlight the most important findings: price targets, analyst consensus, recent performance, and any major news or events.
+      - Clearly state any risks or opportunities identified.
+      - Use bullet points or a short numbered list for clarity if needed.
+   c. **Key Insights** (### header):
+      - List and explain the most relevant insights for a stockholder or potential buyer, such as:
+        - Price forecasts and valuation
+        - Geopolitical or macroeconomic factors
+        - Regulatory changes
+        - Company-specific news or events
+        - Analyst recommendations
+
+   d. **Sources** (### header):
+      - List all sources used in your report.
+      - For each source, provide the full link (URL) or document path.
+      - Use a numbered list ([1], [2], etc.) and avoid duplicates.
+      - Example:
+        [1] https://www.b3.com.br/en_us/
+        [2] https://www.valorinveste.globo.com/
+      - Only include sources that were actually referenced in the summary or key insights.
+
+4. **General guidelines:**
+   - Do not mention the names of interviewers or specialists.
+   - Keep the section under the word limit given below.
+   - Do not include a preamble before the report title.
+   - Ensure the report is clear, actionable, and relevant for investors interested in the stock.
+
+The analyst's focus and the word limit are given below; the source documents are given by the user."""
+
+WRITER_PREAMBLE = """You are a financial technical writer finalizing a consolidated report on Brazilian stocks.
+
+You have a team of analysts. Each analyst has:
+1. Conducted an interview with a specialist about a specific stock or a relevant macro/geopolitical factor.
+2. Written their findings in a memo.
+
+The report topic and the memos are given below. You will be asked to write one part of the report: the main body, the introduction or the conclusion.
+
+Citations in the memos are annotated in brackets, e.g. [1] or [2], and are already numbered consistently across memos. Preserve them exactly as written next to the facts they support and do not renumber them. Do not write a Sources section; the list of sources is added automatically.
+
+Use markdown formatting. Do not include a preamble, and do not mention analyst names."""
+
+REPORT_TASK = """Write the main body of the report.
+
+1. Carefully analyze the insights from each memo, focusing on actionable information for stockholders or potential buyers: price forecasts, recent news, geopolitical and macroeconomic factors, risks, opportunities, and anything that could impact the stock's value.
+2. Consolidate the main points from all memos into a single, cohesive, and actionable narrative.
+3. Summarize the most important findings, connecting the core ideas from all memos.
+4. Do not write a conclusion, nor a summary, just a report.
+
+Start your report with a single title header: ## Stock Insights
+Do not use subheadings."""
+
+INTRODUCTION_TASK = """Write the introduction of the report: about 100 words, concisely presenting all sections of the report, focused on the stock context.
+
+Create an engaging title and use the # header for the title, then use ## Introduction as the section header."""
+
+CONCLUSION_TASK = """Write the conclusion of the report: about 100 words, concisely recapping all sections of the report, focused on the stock context.
+
+Use ## Conclusion as the section header."""
+
+DIGEST_INSTRUCTIONS = f"""You are a financial technical writer condensing research memos about Brazilian stocks.
+
+You will receive several memos, each written by an analyst covering one stock or a macro/geopolitical factor.
+
+Merge them into a single memo of at most {DIGEST_MAX_WORDS} words:
+- Keep, for each stock, its ticker, price forecasts, analyst consensus, key news, risks and opportunities.
+- Keep the most relevant macroeconomic and geopolitical factors.
+- Keep every citation exactly as written in brackets, e.g. [1] or [2], next to the facts it supports. Do not renumber them.
+- Use ### headers per stock or theme and concise bullet points.
+- Do not include a preamble, a conclusion or a Sources section."""
+
+
+def today() -> str:
+    """
+    Today's date as shown in prompts: the date only, so it stays stable all day, taken on each
+    call in the market's timezone (the pre-warm's), so long-lived workers roll over at midnight.
+    """
+    return datetime.now(timezone(timedelta(hours=PREWARM_UTC_OFFSET_HOURS))).strftime("%Y-%m-%d")
+
+
+def assemble(instructions: str, stable: Sequence[str] = (), history: Sequence[BaseMessage] = (),
+             dynamic: Optional[str] = None) -> List[BaseMessage]:
+    """
+    Builds the messages of a prompt, from the most to the least stable part.
+
+    Args:
+        instructions: Static instructions, identical for every call of a node
+        stable: Data that changes slowly (date, persona, sections), appended to the system message
+        history: Conversation so far
+        dynamic: Per-call content, sent as the last message
+
+    Returns:
+        list: Messages to send to the model
+    """
+    system = "\n\n".join([instructions, *[part for part in stable if part]])
+    messages = [SystemMessage(content=system), *history]
+    if dynamic:
+        messages.append(HumanMessage(content=dynamic))
+    return messages
+
+
+def analyst_prompt(stocks: List[str]) -> List[BaseMessage]:
+    return assemble(ANALYST_INSTRUCTIONS, dynamic=f"Stocks: {', '.join(stocks)}\n\n"
+                    "Generate the set of analysts as structured output.")
+
+
+def question_prompt(persona: str, history: Sequence[BaseMessage]) -> List[BaseMessage]:
+    return assemble(QUESTION_INSTRUCTIONS, [f"Today's date: {today()}", f"Your persona: {persona}"], history)
+
+
+def research_query_prompt(history: Sequence[BaseMessage]) -> List[BaseMessage]:
+    return assemble(RESEARCH_QUERY_INSTRUCTIONS, [f"Today's date: {today()}"], history)
+
+
+def answer_prompt(focus: str, context: str, history: Sequence[BaseMessage]) -> List[BaseMessage]:
+    # The context only grows during an interview, so it goes before the conversation: each turn
+    # shares the previous turn's prefix up to the end of the earlier documents
+    return assemble(ANSWER_INSTRUCTIONS, [f"The analyst's area of focus: {focus}", f"Context:\n\n{context}"], history)
+
+
+def section_prompt(focus: str, max_words: int, context: str) -> List[BaseMessage]:
+    return assemble(SECTION_WRITER_INSTRUCTIONS, [f"Analyst focus: {focus}", f"Word limit: {max_words} words"],
+                    dynamic=f"Use this source to write your section: {context}")
+
+
+def writer_prompt(topic: str, sections: str, task: str) -> List[BaseMessage]:
+    """Prompt of the final writers; only the task differs between them."""
+    return assemble(WRITER_PREAMBLE, [f"Report topic: {topic}", f"Memos from your analysts:\n\n{sections}"],
+                    dynamic=task)
+
+
+def digest_prompt(memos: str) -> List[BaseMessage]:
+    return assemble(DIGEST_INSTRUCTIONS, dynamic=f"Merge these memos:\n\n{memos}")
+
+
+class PromptCacheStats:
+    """
+    Prompt and cached prompt tokens per node, read from the responses' usage metadata.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, node: str, message: Any) -> None:
+        usage = getattr(message, "usage_metadata", None)
+        if not usage:
+            return
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        with self._lock:
+            stats = self._nodes.setdefault(node, {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+            stats["calls"] += 1
+            stats["input_tokens"] += usage.get("input_tokens") or 0
+            stats["cached_tokens"] += cached
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            nodes = {node: dict(stats) for node, stats in self._nodes.items()}
+        for stats in nodes.values():
+            stats["cached_ratio"] = stats["cached_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0
+        return nodes
+
+
+# Process-wide statistics
+prompt_cache_stats = PromptCacheStats()
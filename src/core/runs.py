@@ -0,0 +1,90 @@
+"""
+Per-run bookkeeping kept outside the graph checkpoints.
+
+Parallel interview branches only reach the checkpoint when their superstep commits, so
+a run that hits its deadline while one interview is still running has no sections in
+its checkpointed state. Each finished section is recorded here as soon as it is
+written, so the partial report can be assembled from it. A run past its deadline is
+also cancelled here: its next LLM or search call raises `RunCancelled`, which unwinds
+the graph instead of letting it keep spending the shared budget.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+class RunCancelled(Exception):
+    """Raised by the calls of a run that was cancelled (e.g. past its deadline)."""
+
+
+class _Run:
+    __slots__ = ("sections", "cancelled")
+
+    def __init__(self, sections: Iterable[str]):
+        self.sections: List[str] = list(sections)
+        self.cancelled = threading.Event()
+
+
+class RunRegistry:
+    """
+    Finished sections and cancellation flags, keyed by run.
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, _Run] = {}
+        self._lock = threading.Lock()
+        self.cancelled = 0
+
+    def start(self, run_id: str, sections: Iterable[str] = ()) -> None:
+        """
+        Registers a run with the sections it starts with (e.g. pre-warmed ones).
+        """
+        with self._lock:
+            self._runs[run_id] = _Run(sections)
+
+    def add_section(self, run_id: Optional[str], ref: str) -> None:
+        """
+        Records a finished section of a registered run.
+        """
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and ref not in run.sections:
+                run.sections.append(ref)
+
+    def sections(self, run_id: str) -> List[str]:
+        """
+        Returns the sections finished so far, in the order they were written.
+        """
+        with self._lock:
+            run = self._runs.get(run_id)
+            return list(run.sections) if run is not None else []
+
+    def cancel(self, run_id: str) -> None:
+        """
+        Makes the run's next LLM and search calls raise `RunCancelled`.
+        """
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and not run.cancelled.is_set():
+                run.cancelled.set()
+                self.cancelled += 1
+
+    def check(self, run_id: Optional[str]) -> None:
+        """
+        Raises `RunCancelled` if the run was cancelled; unknown runs are never cancelled.
+        """
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is not None and run.cancelled.is_set():
+            raise RunCancelled(f"Run {run_id} was cancelled")
+
+    def discard(self, run_id: str) -> None:
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"runs": len(self._runs), "cancelled": self.cancelled}
+
+
+# Process-wide registry shared by all runs
+runs = RunRegistry()
@@ -0,0 +1,253 @@
+"""
+Fair scheduling of LLM and search calls across tenants.
+
+Every run fans out into parallel interviews, so a single large portfolio can issue
+dozens of calls at once and hold the whole provider concurrency budget. Calls are
+admitted through a limiter with a fixed number of in-flight slots; when the budget is
+full, callers wait in per-tenant queues that are served by weighted fair sharing
+(stride scheduling), with interactive requests weighted above batch work. Batch work
+may only hold part of the budget, so interactive requests always find free slots,
+while idle capacity is never left unused.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from ..config import (
+    LLM_MAX_IN_FLIGHT, SEARCH_MAX_IN_FLIGHT, TENANT_WEIGHTS, INTERACTIVE_WEIGHT, BATCH_MAX_SHARE
+)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+DEFAULT_TENANT = "default"
+MAX_TRACKED_QUEUES = 1024
+
+
+class SlotTimeout(TimeoutError):
+    """Raised when no slot frees up within the caller's timeout (e.g. before the run's deadline)."""
+
+
+class _Waiter:
+    __slots__ = ("event", "granted", "enqueued_at")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class FairShareLimiter:
+    """
+    Bounded number of in-flight calls, shared fairly between tenants and priority classes.
+    """
+
+    def __init__(self, capacity: int, tenant_weights: Optional[Dict[str, float]] = None,
+                 interactive_weight: float = INTERACTIVE_WEIGHT, batch_max_share: float = BATCH_MAX_SHARE):
+        """
+        Initializes the limiter.
+
+        Args:
+            capacity: Maximum number of calls in flight at the same time
+            tenant_weights: Relative share of each tenant (tenants not listed weigh 1)
+            interactive_weight: Share multiplier of interactive calls over batch calls
+            batch_max_share: Fraction of the capacity that batch calls may hold
+        """
+        self.capacity = max(1, capacity)
+        self.tenant_weights = tenant_weights or {}
+        self.interactive_weight = interactive_weight
+        self.batch_capacity = max(1, int(self.capacity * batch_max_share))
+        self._lock = threading.Lock()
+        self._queues: Dict[Tuple[str, str], Deque[_Waiter]] = {}
+        self._pass: Dict[Tuple[str, str], float] = {}
+        self._virtual_time = 0.0
+        self._in_flight = {INTERACTIVE: 0, BATCH: 0}
+        self._granted = {INTERACTIVE: 0, BATCH: 0}
+        self._wait_seconds = {INTERACTIVE: 0.0, BATCH: 0.0}
+        self.timeouts = 0
+
+    def _weight(self, key: Tuple[str, str]) -> float:
+        tenant, priority = key
+        weight = self.tenant_weights.get(tenant, 1.0)
+        return weight * self.interactive_weight if priority == INTERACTIVE else weight
+
+    def _eligible(self, priority: str) -> bool:
+        if self._in_flight[INTERACTIVE] + self._in_flight[BATCH] >= self.capacity:
+            return False
+        return priority == INTERACTIVE or self._in_flight[BATCH] < self.batch_capacity
+
+    def _activate(self, key: Tuple[str, str]) -> None:
+        # A queue coming back from idle starts at the current virtual time, without banked credit
+        self._pass[key] = max(self._pass.get(key, 0.0), self._virtual_time)
+        if len(self._pass) > MAX_TRACKED_QUEUES:
+            self._pass = {k: v for k, v in self._pass.items()
+                          if k == key or k in self._queues or v > self._virtual_time}
+
+    def _grant(self, key: Tuple[str, str], waited: float = 0.0) -> None:
+        self._virtual_time = max(self._virtual_time, self._pass[key])
+        self._pass[key] += 1.0 / self._weight(key)
+        priority = key[1]
+        self._in_flight[priority] += 1
+        self._granted[priority] += 1
+        self._wait_seconds[priority] += waited
+
+    def _dispatch(self) -> None:
+        """Hands free slots to the eligible queue with the lowest pass value (called with the lock held)."""
+        while True:
+            candidates = [key for key, queue in self._queues.items() if queue and self._eligible(key[1])]
+            if not candidates:
+                return
+            key = min(candidates, key=lambda k: self._pass[k])
+            waiter = self._queues[key].popleft()
+            if not self._queues[key]:
+                del self._queues[key]
+            self._grant(key, time.monotonic() - waiter.enqueued_at)
+            waiter.granted = True
+            waiter.event.set()
+
+    def acquire(self, tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE,
+                timeout: Optional[float] = None) -> bool:
+        """
+        Waits for a slot.
+
+        Args:
+            tenant: Tenant issuing the call
+            priority: INTERACTIVE or BATCH
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            bool: True if a slot was acquired; it must then be given back with `release`
+        """
+        key = (tenant, priority)
+        with self._lock:
+            self._activate(key)
+            if not self._queues and self._eligible(priority):
+                self._grant(key)
+                return True
+            waiter = _Waiter()
+            self._queues.setdefault(key, deque()).append(waiter)
+            self._dispatch()
+        if waiter.event.wait(timeout):
+            return True
+        with self._lock:
+            if waiter.granted:
+                return True
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[key]
+            self.timeouts += 1
+            return False
+
+    def try_acquire(self, tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE) -> bool:
+        """
+        Takes a slot only if one is free and nobody is waiting; never blocks.
+        """
+        key = (tenant, priority)
+        with self._lock:
+            if self._queues or not self._eligible(priority):
+                return False
+            self._activate(key)
+            self._grant(key)
+            return True
+
+    def release(self, priority: str = INTERACTIVE) -> None:
+        """
+        Gives back a slot acquired with the given priority.
+        """
+        with self._lock:
+            self._in_flight[priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE, timeout: Optional[float] = None):
+        """
+        Holds a slot for the duration of the block, raising `SlotTimeout` if none is granted within `timeout`.
+        """
+        if not self.acquire(tenant, priority, timeout):
+            raise SlotTimeout(f"No slot for {tenant}/{priority} within {timeout:.1f}s")
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            queued: Dict[str, int] = {}
+            for (tenant, priority), queue in self._queues.items():
+                queued[f"{tenant}/{priority}"] = len(queue)
+            return {
+                "capacity": self.capacity,
+                "in_flight": dict(self._in_flight),
+                "queued": queued,
+                "granted": dict(self._granted),
+                "mean_wait_seconds": {
+                    priority: self._wait_seconds[priority] / self._granted[priority] if self._granted[priority] else 0.0
+                    for priority in self._granted
+                },
+                "timeouts": self.timeouts,
+            }
+
+
+class TenantScheduler:
+    """
+    Maps runs to their tenant and priority and admits their LLM and search calls.
+    """
+
+    def __init__(self, llm_limiter: FairShareLimiter, search_limiter: FairShareLimiter):
+        self.llm_limiter = llm_limiter
+        self.search_limiter = search_limiter
+        self._runs: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, run_id: str, tenant: str = DEFAULT_TENANT, priority: str = INTERACTIVE) -> None:
+        """
+        Records the tenant and priority of a run. Calls of unregistered runs are scheduled as
+        batch work of the default tenant.
+        """
+        with self._lock:
+            self._runs[run_id] = (tenant, priority)
+
+    def unregister(self, run_id: str) -> None:
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def classify(self, run_id: Optional[str]) -> Tuple[str, str]:
+        with self._lock:
+            return self._runs.get(run_id, (DEFAULT_TENANT, BATCH))
+
+    def llm(self, run_id: Optional[str], timeout: Optional[float] = None):
+        """Context manager holding an LLM call slot for a run, waiting at most `timeout` seconds."""
+        return self.llm_limiter.slot(*self.classify(run_id), timeout=timeout)
+
+    def search(self, run_id: Optional[str], timeout: Optional[float] = None):
+        """Context manager holding a search call slot for a run, waiting at most `timeout` seconds."""
+        return self.search_limiter.slot(*self.classify(run_id), timeout=timeout)
+
+    def _reserve(self, limiter: FairShareLimiter, run_id: Optional[str]) -> Optional[Callable[[], None]]:
+        tenant, priority = self.classify(run_id)
+        if not limiter.try_acquire(tenant, priority):
+            return None
+        return lambda: limiter.release(priority)
+
+    def reserve_llm(self, run_id: Optional[str]) -> Optional[Callable[[], None]]:
+        """Takes an extra LLM slot without waiting; returns its release function, or None if none is free."""
+        return self._reserve(self.llm_limiter, run_id)
+
+    def reserve_search(self, run_id: Optional[str]) -> Optional[Callable[[], None]]:
+        """Takes an extra search slot without waiting; returns its release function, or None if none is free."""
+        return self._reserve(self.search_limiter, run_id)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            runs = len(self._runs)
+        return {"runs": runs, "llm": self.llm_limiter.stats(), "search": self.search_limiter.stats()}
+
+
+# Process-wide scheduler shared by all runs
+scheduler = TenantScheduler(
+    FairShareLimiter(LLM_MAX_IN_FLIGHT, TENANT_WEIGHTS),
+    FairShareLimiter(SEARCH_MAX_IN_FLIGHT, TENANT_WEIGHTS),
+)
@@ -1,12 +1,18 @@
 """
 State definitions for the agent system.
 """
-from typing import List, Annotated
+from typing import List, Annotated, Optional
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 import operator
 from langgraph.graph import MessagesState 
 
+def keep_first(current, new):
+    """
+    Reducer for values set once per run and echoed back by every parallel branch.
+    """
+    return current if current is not None else new
+
 class Analyst(BaseModel):
     """
     Model to represent an analyst with information about their affiliation and focus.
@@ -53,16 +59,21 @@ class AnalystGenerationState(TypedDict):
     max_analysts: int  # Number of analysts
     analysts: List[Analyst]  # Analysts' questions
     stocks: List[str]  # List of stocks for analysis
+    deadline: Optional[float]  # Unix timestamp by which the run must finish
+    run_id: Optional[str]  # Identifier of the research run
 
 class InterviewState(MessagesState):
     """
     State for individual interview.
     """
     max_num_turns: int  # Number of conversation turns
-    context: Annotated[list, operator.add]  # Source documents
+    context: Annotated[list, operator.add]  # Blob references to source documents
     analyst: Analyst  # Analyst asking questions
-    interview: str  # Interview transcript
-    sections: list  # Final key duplicated in the outer state for the Send() API
+    interview: str  # Blob reference to the interview transcript
+    sections: list  # Blob references; final key duplicated in the outer state for the Send() API
+    deadline: Optional[float]  # Unix timestamp by which the run must finish
+    run_id: Optional[str]  # Identifier of the research run
+    stock: Optional[str]  # Stock covered by the analyst (None for the geopolitical analyst)
 
 class ResearchGraphState(TypedDict):
     """
@@ -71,9 +82,12 @@ class ResearchGraphState(TypedDict):
     topic: str  # Research topic
     max_analysts: int  # Number of analysts
     analysts: List[Analyst]  # Analyst asking questions
-    sections: Annotated[list, operator.add]  # Key for the Send() API
+    sections: Annotated[list, operator.add]  # Blob references to sections; key for the Send() API
     introduction: str  # Introduction for the final report
     content: str  # Content for the final report
+    sources: List[str]  # Consolidated sources; citation [n] refers to sources[n - 1]
     conclusion: str  # Conclusion for the final report
     final_report: str  # Final report
     stocks: List[str]  # List of stocks for analysis
+    deadline: Annotated[Optional[float], keep_first]  # Unix timestamp by which the run must finish
+    run_id: Annotated[Optional[str], keep_first]  # Identifier of the research run
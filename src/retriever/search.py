@@ -1,9 +1,12 @@
 """
 Implementation of search using the Tavily API.
 """
-from typing import Dict, Any, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 from langchain_community.tools.tavily_search import TavilySearchResults
-from src.config import TAVILY_API_KEY, MAX_SEARCH_RESULTS
+from src.config import TAVILY_API_KEY, MAX_SEARCH_RESULTS, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS
 from src.utils.helpers import format_search_results
 
 class SearchEngine:
@@ -19,6 +22,32 @@ class SearchEngine:
             max_results: Maximum number of results to return
         """
         self.search_tool = TavilySearchResults(max_results=max_results)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def cached(self, query: str) -> Optional[str]:
+        """
+        Returns a recent result for the same query without calling the API.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            str | None: Formatted search results, or None if not cached or expired
+        """
+        key = query.strip().lower()
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None or time.time() - entry[0] > SEARCH_CACHE_TTL_SECONDS:
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+    
+    def _remember(self, query: str, result: str) -> None:
+        with self._cache_lock:
+            self._cache[query.strip().lower()] = (time.time(), result)
+            while len(self._cache) > SEARCH_CACHE_SIZE:
+                self._cache.popitem(last=False)
     
     def search(self, query: str) -> str:
         """
@@ -36,7 +65,9 @@ class SearchEngine:
             print(f"Search query: {query}")
             
             # Format the results
-            return format_search_results(search_results, query)
+            result = format_search_results(search_results, query)
+            self._remember(query, result)
+            return result
             
         except Exception as e:
             print(f"Error in web_search: {e}")
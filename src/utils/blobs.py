@@ -0,0 +1,151 @@
+"""
+Content-addressed blob store for large graph payloads.
+
+Search documents, interview transcripts and sections are stored once here and the
+graph state only carries their references, so checkpoints and parallel branches
+share a single copy of each payload. Each run releases its payloads when it ends.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from src.config import BLOB_STORE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blob:"
+
+
+class BlobStore:
+    """
+    Thread-safe in-memory store of text blobs keyed by their SHA-256 digest.
+
+    Blobs stored for a run are held until the run releases them, so a live run never
+    loses its payloads and finished runs free theirs. Blobs stored without a run are
+    evicted least recently used first once the store exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = BLOB_STORE_MAX_BYTES):
+        """
+        Initializes the blob store.
+
+        Args:
+            max_bytes: Size above which the least recently used blobs not held by a run are evicted
+        """
+        self.max_bytes = max_bytes
+        self._blobs: Dict[str, str] = {}
+        self._unowned: "OrderedDict[str, None]" = OrderedDict()  # LRU order of blobs no run holds
+        self._owners: Dict[str, Set[str]] = {}  # Run -> references it holds
+        self._refcounts: Dict[str, int] = {}  # Reference -> number of runs holding it
+        self._size = 0
+        self._puts = 0
+        self._dedup_hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def put(self, text: str, owner: Optional[str] = None) -> str:
+        """
+        Stores a text blob (once) and returns its reference.
+
+        Args:
+            text: Payload to store
+            owner: Run holding the blob until it calls `release`; None leaves it to LRU eviction
+
+        Returns:
+            str: Reference in the form "blob:<sha256>"
+        """
+        ref = BLOB_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._puts += 1
+            if ref in self._blobs:
+                self._dedup_hits += 1
+            else:
+                self._blobs[ref] = text
+                self._size += len(text)
+            if owner is not None:
+                held = self._owners.setdefault(owner, set())
+                if ref not in held:
+                    held.add(ref)
+                    self._refcounts[ref] = self._refcounts.get(ref, 0) + 1
+                    self._unowned.pop(ref, None)
+            elif ref not in self._refcounts:
+                self._unowned[ref] = None
+                self._unowned.move_to_end(ref)
+            self._evict()
+        return ref
+
+    def _evict(self) -> None:
+        """Drops the least recently used blobs no run holds (called with the lock held)."""
+        while self._size > self.max_bytes and self._unowned:
+            ref, _ = self._unowned.popitem(last=False)
+            self._size -= len(self._blobs.pop(ref))
+
+    def release(self, owner: str) -> None:
+        """
+        Releases the blobs held by a run; blobs no other run holds are freed.
+
+        Args:
+            owner: Run whose blobs are released
+        """
+        with self._lock:
+            for ref in self._owners.pop(owner, ()):
+                self._refcounts[ref] -= 1
+                if self._refcounts[ref] == 0:
+                    del self._refcounts[ref]
+                    self._size -= len(self._blobs.pop(ref))
+
+    def get(self, ref: str) -> str:
+        """
+        Resolves a reference to its text. Values that are not references are returned unchanged.
+
+        Args:
+            ref: Blob reference
+
+        Returns:
+            str: Stored text, or an empty string if the blob is no longer stored
+        """
+        if not is_blob_ref(ref):
+            return ref
+        with self._lock:
+            text = self._blobs.get(ref)
+            if text is None:
+                self._misses += 1
+            elif ref in self._unowned:
+                self._unowned.move_to_end(ref)
+        if text is None:
+            logger.warning(f"Blob {ref[:20]}... is no longer stored, using an empty payload")
+            return ""
+        return text
+
+    def get_many(self, refs: List[str]) -> List[str]:
+        """
+        Resolves a list of references, preserving order.
+        """
+        return [self.get(ref) for ref in refs]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns counters describing the store's current footprint.
+        """
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "bytes": self._size,
+                "runs": len(self._owners),
+                "puts": self._puts,
+                "dedup_hits": self._dedup_hits,
+                "misses": self._misses,
+            }
+
+
+def is_blob_ref(value) -> bool:
+    """
+    Checks whether a state value is a blob reference.
+    """
+    return isinstance(value, str) and value.startswith(BLOB_PREFIX) and len(value) == len(BLOB_PREFIX) + 64
+
+
+# Process-wide store shared by all graph runs
+blob_store = BlobStore()
@@ -0,0 +1,167 @@
+"""
+Deterministic citation consolidation for report sections.
+
+Each section cites its own sources as [1], [2], ... and lists them under a Sources
+header. These helpers deduplicate sources across sections, renumber the inline
+markers globally and build the final Sources block, so the report writer only
+has to produce prose.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# "## Sources", "**Sources:**", "Sources:"
+SOURCES_HEADER_RE = re.compile(r"^\s{0,3}(?:#{1,6}\s*)?(?:\*\*|__)?\s*Sources\s*:?\s*(?:\*\*|__)?\s*:?\s*$",
+                               re.IGNORECASE | re.MULTILINE)
+SOURCE_LINE_RE = re.compile(r"^\s*(?:[-*+]\s*|\d+\.\s*)?\[(\d+)\]\s*[:.\-]?\s*(.+?)\s*$")
+# [1], [1, 2], [1][2]; not markdown links such as [text](url)
+MARKER_RE = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\](?!\()")
+# Bracketed numbers below this are citation markers; larger ones (e.g. years such as [2024]) are not
+MAX_CITATION_NUMBER = 999
+URL_RE = re.compile(r"https?://[^\s<>\]\)\"']+")
+
+
+def normalize_source(source: str) -> str:
+    """
+    Returns the key used to detect duplicate sources: the URL without trailing
+    punctuation or slash, or the lowercased text when there is no URL.
+    """
+    match = URL_RE.search(source)
+    if match:
+        return match.group(0).rstrip(".,;").rstrip("/").lower()
+    return source.strip().lower()
+
+
+def split_sources(section: str) -> Tuple[str, Dict[int, str]]:
+    """
+    Splits a section into its body and its numbered source list.
+
+    Args:
+        section: Section in Markdown, optionally ending with a Sources header and list
+
+    Returns:
+        tuple: (body, {local number: source})
+    """
+    match = None
+    for match in SOURCES_HEADER_RE.finditer(section):
+        pass
+    if match is None:
+        return section.rstrip(), {}
+
+    sources = {}
+    for line in section[match.end():].splitlines():
+        source = SOURCE_LINE_RE.match(line)
+        if source:
+            sources.setdefault(int(source.group(1)), source.group(2))
+    return section[:match.start()].rstrip(), sources
+
+
+def rewrite_markers(text: str, mapping: Dict[int, int], drop_unmapped: bool = False) -> str:
+    """
+    Rewrites inline citation markers using a number mapping; repeated numbers inside
+    a marker are collapsed. Bracketed numbers without a mapping are left unchanged,
+    unless `drop_unmapped` is set: then unmapped citation numbers are removed (a
+    marker left empty is removed with the space before it). Numbers above
+    MAX_CITATION_NUMBER (e.g. a year such as [2024]) are never dropped.
+    """
+    def replace(match) -> str:
+        parts = [int(part) for part in match.group(2).split(",")]
+        if drop_unmapped:
+            kept = [part for part in parts if part in mapping or part > MAX_CITATION_NUMBER]
+            if not kept:
+                return ""
+            if kept != parts and not any(part in mapping for part in kept):
+                return match.group(1) + "[" + ", ".join(str(part) for part in kept) + "]"
+            parts = kept
+        if not any(part in mapping for part in parts):
+            return match.group(0)
+        numbers = []
+        for part in parts:
+            new = mapping.get(part, part)
+            if new not in numbers:
+                numbers.append(new)
+        return match.group(1) + "".join(f"[{n}]" for n in numbers)
+
+    return re.sub(r"([ \t]*)" + MARKER_RE.pattern, replace, text)
+
+
+class CitationRegistry:
+    """
+    Assigns global citation numbers to sources in the order they are first seen.
+    """
+
+    def __init__(self):
+        self.sources: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def number_for(self, source: str) -> int:
+        """
+        Returns the global number of a source, registering it if it is new.
+        """
+        key = normalize_source(source)
+        if key not in self._index:
+            self.sources.append(source.strip())
+            self._index[key] = len(self.sources)
+        return self._index[key]
+
+    def add_section(self, section: str) -> str:
+        """
+        Registers a section's sources and returns its body with globally numbered markers.
+
+        Args:
+            section: Section in Markdown with its own Sources list
+
+        Returns:
+            str: Section body without the Sources list
+
+        Markers of a section with a Sources list that point at no listed source are
+        dropped, since their number would refer to another section's source globally.
+        """
+        body, sources = split_sources(section)
+        mapping = {local: self.number_for(source) for local, source in sources.items()}
+        return rewrite_markers(body, mapping, drop_unmapped=bool(sources))
+
+
+def consolidate_sections(sections: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Renumbers the citations of several sections against one global source list.
+
+    Args:
+        sections: Sections in Markdown, each with its own Sources list
+
+    Returns:
+        tuple: (section bodies with global markers, global source list)
+    """
+    registry = CitationRegistry()
+    bodies = [registry.add_section(section) for section in sections]
+    return bodies, registry.sources
+
+
+def finalize_citations(text: str, sources: List[str]) -> Tuple[str, List[str]]:
+    """
+    Keeps only the sources cited in the text, renumbered by first appearance.
+
+    Args:
+        text: Report text with global citation markers
+        sources: Global source list (marker [n] refers to sources[n - 1])
+
+    Returns:
+        tuple: (text with compact markers, cited sources in order)
+    """
+    mapping: Dict[int, int] = {}
+    cited: List[str] = []
+    for match in MARKER_RE.finditer(text):
+        for part in match.group(1).split(","):
+            number = int(part)
+            if number not in mapping and 1 <= number <= len(sources):
+                cited.append(sources[number - 1])
+                mapping[number] = len(cited)
+    return rewrite_markers(text, mapping), cited
+
+
+def format_sources(sources: List[str]) -> Optional[str]:
+    """
+    Formats a source list as the lines of a Sources block, or None if it is empty.
+    """
+    if not sources:
+        return None
+    return "\n".join(f"[{i}] {source}" for i, source in enumerate(sources, start=1))
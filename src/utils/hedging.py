@@ -0,0 +1,217 @@
+"""
+Hedged LLM and search calls.
+
+A run ends with its slowest interview, and the slowest interview is usually held up
+by one call that hangs far past its normal latency. For hedge-enabled keys (graph
+nodes, or "search"), a call still running after the key's rolling latency percentile
+gets a duplicate; the first successful result wins. Hedges are capped to a fraction
+of the calls and need a free slot in the caller's fair-share budget.
+
+Synchronous HTTP calls cannot be interrupted mid-request: a losing call that already
+started runs to completion in the background and its result is discarded (calls that
+have not started yet are cancelled).
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError, wait
+from typing import Callable, Deque, Dict, Iterable, Optional, TypeVar
+
+from src.config import (
+    HEDGE_NODES, HEDGE_PERCENTILE, HEDGE_MAX_RATIO, HEDGE_MIN_SAMPLES, HEDGE_WINDOW,
+    LLM_MAX_IN_FLIGHT, SEARCH_MAX_IN_FLIGHT
+)
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """
+    Rolling window of call durations.
+    """
+
+    def __init__(self, size: int = HEDGE_WINDOW):
+        self._values: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._values.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._values:
+            return None
+        ordered = sorted(self._values)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class _KeyStats:
+    def __init__(self, window: int):
+        self.primary = LatencyWindow(window)  # Duration of the original calls, hedged or not
+        self.observed = LatencyWindow(window)  # Latency seen by the caller
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+
+
+class Hedger:
+    """
+    Runs calls with a duplicate request once they exceed their key's latency percentile.
+    """
+
+    def __init__(self, enabled: Iterable[str] = HEDGE_NODES, percentile: float = HEDGE_PERCENTILE,
+                 max_ratio: float = HEDGE_MAX_RATIO, min_samples: int = HEDGE_MIN_SAMPLES,
+                 window: int = HEDGE_WINDOW, max_workers: int = 2 * (LLM_MAX_IN_FLIGHT + SEARCH_MAX_IN_FLIGHT)):
+        """
+        Initializes the hedger.
+
+        Args:
+            enabled: Keys whose calls are hedged (graph node names, or "search")
+            percentile: Latency percentile after which a call is duplicated
+            max_ratio: Maximum number of hedges as a fraction of the hedge-enabled calls
+            min_samples: Calls observed for a key before it is hedged
+            window: Number of recent durations kept per key
+            max_workers: Threads running hedge-enabled calls and their duplicates
+        """
+        self.enabled = set(enabled)
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _KeyStats] = {}
+        self.calls = 0
+        self.hedged = 0
+
+    def _submit(self, fn: Callable[[], T]) -> Future:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+        # Keep the caller's context (LangChain run tree, graph node metadata) in the worker thread
+        return self._executor.submit(contextvars.copy_context().run, fn)
+
+    def _key_stats(self, key: str) -> _KeyStats:
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _KeyStats(self.window)
+            return stats
+
+    def _allow_hedge(self, stats: _KeyStats, reserve: Optional[Callable[[], Optional[Callable[[], None]]]]):
+        """Returns the release function of the hedge's slot (a no-op without a budget), or None if denied."""
+        with self._lock:
+            allowed = self.hedged + 1 <= self.max_ratio * self.calls
+        release = (reserve() if reserve is not None else (lambda: None)) if allowed else None
+        with self._lock:
+            if release is None:
+                stats.denied += 1
+            else:
+                self.hedged += 1
+                stats.hedged += 1
+        return release
+
+    def call(self, key: str, fn: Callable[[], T],
+             reserve: Optional[Callable[[], Optional[Callable[[], None]]]] = None) -> T:
+        """
+        Calls `fn`, hedging it if the key is enabled.
+
+        Args:
+            key: Node name (or "search") the call belongs to
+            fn: The call; must be safe to run twice
+            reserve: Takes an extra slot for the duplicate without blocking, returning its release
+                function, or None if no slot is free
+
+        Returns:
+            The result of whichever call succeeded first
+        """
+        if key not in self.enabled:
+            return fn()
+
+        stats = self._key_stats(key)
+        with self._lock:
+            self.calls += 1
+            stats.calls += 1
+            threshold = stats.primary.percentile(self.percentile) if len(stats.primary) >= self.min_samples else None
+
+        started = time.monotonic()
+
+        def record_primary(future: Future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                with self._lock:
+                    stats.primary.add(time.monotonic() - started)
+
+        primary = self._submit(fn)
+        primary.add_done_callback(record_primary)
+        winner = primary
+        try:
+            if threshold is None:
+                return primary.result()
+            try:
+                return primary.result(timeout=threshold)
+            except TimeoutError:
+                pass
+
+            release = self._allow_hedge(stats, reserve)
+            if release is None:
+                return primary.result()
+
+            hedge = self._submit(fn)
+            # The extra slot is held until both calls have finished
+            remaining = [2]
+            def finished(_: Future) -> None:
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    release()
+            primary.add_done_callback(finished)
+            hedge.add_done_callback(finished)
+
+            pending = {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                succeeded = [future for future in done if future.exception() is None]
+                if succeeded:
+                    winner = succeeded[0]
+                    break
+            for future in pending:
+                future.cancel()
+            if winner is hedge:
+                with self._lock:
+                    stats.hedge_wins += 1
+            # Both failed: raise the original error
+            return winner.result()
+        finally:
+            if winner.done() and winner.exception() is None:
+                with self._lock:
+                    stats.observed.add(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            keys = {}
+            for key, stats in self._stats.items():
+                primary_p99 = stats.primary.percentile(99)
+                observed_p99 = stats.observed.percentile(99)
+                keys[key] = {
+                    "calls": stats.calls,
+                    "hedged": stats.hedged,
+                    "hedge_rate": stats.hedged / stats.calls if stats.calls else 0.0,
+                    "hedge_wins": stats.hedge_wins,
+                    "denied": stats.denied,
+                    "threshold_seconds": stats.primary.percentile(self.percentile),
+                    "p99_unhedged_seconds": primary_p99,
+                    "p99_seconds": observed_p99,
+                    "p99_improvement_seconds": (primary_p99 - observed_p99)
+                    if primary_p99 is not None and observed_p99 is not None else None,
+                }
+            return {"enabled": sorted(self.enabled), "calls": self.calls, "hedged": self.hedged, "keys": keys}
+
+
+# Process-wide hedger for the graph nodes' LLM and search calls
+hedger = Hedger()
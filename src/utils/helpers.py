@@ -1,8 +1,10 @@
 """
 Helper functions for the agent system.
 """
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from langchain_core.messages import get_buffer_string, AIMessage, HumanMessage, SystemMessage
+from src.utils.citations import split_sources, format_sources
 
 def get_num_specialist_answers(messages: List[Dict[str, Any]], name: str = "specialist") -> int:
     """
@@ -17,6 +19,71 @@ def get_num_specialist_answers(messages: List[Dict[str, Any]], name: str = "spec
     """
     return len([m for m in messages if isinstance(m, AIMessage) and m.name == name])
 
+def get_remaining_time(state: Dict[str, Any]) -> Optional[float]:
+    """
+    Returns the seconds left before the run's deadline.
+    
+    Args:
+        state: Graph state, optionally holding a "deadline" Unix timestamp
+        
+    Returns:
+        float | None: Remaining seconds (negative once past the deadline), or None if the run has no deadline
+    """
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+def is_short_on_time(state: Dict[str, Any], threshold: float) -> bool:
+    """
+    Checks whether less than `threshold` seconds are left before the run's deadline.
+    """
+    remaining = get_remaining_time(state)
+    return remaining is not None and remaining < threshold
+
+def get_section_titles(sections: List[str]) -> List[str]:
+    """
+    Extracts the title (first markdown header) of each section.
+    
+    Args:
+        sections: List of sections in markdown
+        
+    Returns:
+        List[str]: Section titles, without the leading #'s
+    """
+    titles = []
+    for section in sections:
+        for line in section.splitlines():
+            if line.startswith("#"):
+                titles.append(line.lstrip("#").strip())
+                break
+    return titles
+
+def is_geopolitical(analyst: Any) -> bool:
+    """
+    Checks whether an analyst is the geopolitical analyst, who covers all stocks.
+    """
+    return "geopolitical" in analyst.role.lower()
+
+def match_analyst_stock(analyst: Any, stocks: List[str]) -> Optional[str]:
+    """
+    Returns the stock an analyst covers, i.e. the first stock mentioned in their description.
+    
+    Args:
+        analyst: Analyst with a description
+        stocks: Candidate stocks
+        
+    Returns:
+        str | None: The matched stock, or None for the geopolitical analyst (whose description
+        usually names every stock)
+    """
+    if is_geopolitical(analyst):
+        return None
+    for stock in stocks:
+        if stock in analyst.description.upper():
+            return stock
+    return None
+
 def format_sections_string(sections: List[str]) -> str:
     """
     Concatenates a list of sections into a single string.
@@ -39,14 +106,10 @@ def split_content_and_sources(content: str) -> tuple:
     Returns:
         tuple: (content, sources)
     """
-    if "## Sources" in content:
-        try:
-            content_part, sources = content.split("\n## Sources\n")
-            return content_part, sources
-        except:
-            return content, None
-    else:
+    content_part, sources = split_sources(content)
+    if not sources:
         return content, None
+    return content_part, format_sources([sources[n] for n in sorted(sources)])
 
 def format_search_results(search_results: List[Dict[str, Any]], query: str) -> str:
     """
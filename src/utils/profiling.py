@@ -0,0 +1,305 @@
+"""
+Opt-in profiling of research runs.
+
+A run profile combines a sampling profiler, which periodically records the Python
+stacks of the threads working on the run (network waits show up as socket/SSL frames),
+with a callback handler that records wall and CPU time per graph node. Artifacts are a
+folded-stack file (input for flamegraph.pl or speedscope) and a JSON summary.
+
+Threads are attributed to a run while they execute one of its graph nodes, model or
+tool calls, so concurrent requests do not show up in each other's profiles. Work the
+run hands to shared pools outside those calls (prefetched searches, digest merges) is
+not sampled.
+
+Nothing here is active unless a profile is started, so disabled runs pay no overhead.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.config import PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_SECONDS, PROFILE_DIR, PROFILE_MAX_KEPT
+
+logger = logging.getLogger(__name__)
+
+
+def should_profile(requested: bool = False, sample_rate: float = PROFILE_SAMPLE_RATE) -> bool:
+    """
+    Decides whether a run is profiled: explicitly requested, or sampled.
+    """
+    return requested or (sample_rate > 0 and random.random() < sample_rate)
+
+
+class StackSampler:
+    """
+    Sampling profiler collecting folded stacks of a set of threads.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS,
+                 threads: Optional[Callable[[], Set[int]]] = None):
+        """
+        Initializes the sampler.
+
+        Args:
+            interval: Seconds between samples
+            threads: Returns the ids of the threads to sample; None samples every thread
+        """
+        self.interval = interval
+        self.threads = threads
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        wanted = self.threads() if self.threads is not None else None
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (wanted is not None and thread_id not in wanted):
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(frames))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        """
+        Returns the samples in folded-stack format ("frame;frame;frame count" per line).
+        """
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class RunThreadTracker(BaseCallbackHandler):
+    """
+    Callback handler tracking which threads are currently executing a run's chains, model and tool calls.
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, int] = {}
+        self._active: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _enter(self, run_id: UUID) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._runs[run_id] = thread_id
+            self._active[thread_id] += 1
+
+    def _exit(self, run_id: UUID) -> None:
+        with self._lock:
+            thread_id = self._runs.pop(run_id, None)
+            if thread_id is not None:
+                self._active[thread_id] -= 1
+                if self._active[thread_id] <= 0:
+                    del self._active[thread_id]
+
+    def thread_ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._active)
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._enter(run_id)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._enter(run_id)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._enter(run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._exit(run_id)
+
+
+class NodeTimingHandler(BaseCallbackHandler):
+    """
+    Callback handler recording wall and CPU time of each graph node execution.
+    """
+
+    def __init__(self):
+        self.timings: List[Dict[str, Any]] = []
+        self._open: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the runnables nested inside it
+        if node is None or kwargs.get("name") != node:
+            return
+        with self._lock:
+            self._open[run_id] = (node, time.perf_counter(), time.thread_time(), threading.get_ident())
+
+    def _close(self, run_id: UUID, error: bool) -> None:
+        with self._lock:
+            started = self._open.pop(run_id, None)
+        if started is None:
+            return
+        node, wall_start, cpu_start, thread_id = started
+        wall = time.perf_counter() - wall_start
+        # CPU time is only meaningful if the node finished on the thread it started on
+        cpu = time.thread_time() - cpu_start if threading.get_ident() == thread_id else None
+        with self._lock:
+            self.timings.append({"node": node, "wall_seconds": wall, "cpu_seconds": cpu, "error": error})
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id, error=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._close(run_id, error=True)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregates timings per node: calls, total wall time, total CPU time and their difference (waiting).
+        """
+        nodes: Dict[str, Dict[str, float]] = {}
+        for timing in self.timings:
+            entry = nodes.setdefault(timing["node"], {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            entry["calls"] += 1
+            entry["wall_seconds"] += timing["wall_seconds"]
+            entry["cpu_seconds"] += timing["cpu_seconds"] or 0.0
+        for entry in nodes.values():
+            entry["wait_seconds"] = max(0.0, entry["wall_seconds"] - entry["cpu_seconds"])
+        return nodes
+
+
+class RunProfile:
+    """
+    Profile of a single research run.
+    """
+
+    def __init__(self, run_id: str, directory: str = PROFILE_DIR, max_kept: int = PROFILE_MAX_KEPT):
+        """
+        Initializes the profile.
+
+        Args:
+            run_id: Identifier of the run (the graph thread id)
+            directory: Directory where artifacts are saved
+            max_kept: Number of most recent profiles kept in the directory
+        """
+        self.run_id = run_id
+        self.directory = directory
+        self.max_kept = max_kept
+        self.threads = RunThreadTracker()
+        self.sampler = StackSampler(threads=self.threads.thread_ids)
+        self.node_timings = NodeTimingHandler()
+        self._wall_start = None
+        self._cpu_start = None
+
+    @property
+    def callbacks(self) -> list:
+        """Callback handlers to pass in the graph's run config."""
+        return [self.threads, self.node_timings]
+
+    def start(self) -> "RunProfile":
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.sampler.start()
+        return self
+
+    def stop(self) -> Optional[str]:
+        """
+        Stops profiling and saves the artifacts.
+
+        Returns:
+            str | None: Base name of the saved artifacts, or None if saving failed
+        """
+        self.sampler.stop()
+        name = f"profile_{time.strftime('%Y%m%d_%H%M%S')}_{self.run_id.split('-')[0]}"
+        summary = {
+            "run_id": self.run_id,
+            "wall_seconds": time.perf_counter() - self._wall_start,
+            "process_cpu_seconds": time.process_time() - self._cpu_start,
+            "samples": self.sampler.samples,
+            "sample_interval_seconds": self.sampler.interval,
+            "nodes": self.node_timings.summary(),
+            "node_runs": self.node_timings.timings,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name + ".folded"), "w", encoding="utf-8") as f:
+                f.write(self.sampler.folded())
+            with open(os.path.join(self.directory, name + ".json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        except OSError as e:
+            logger.error(f"Error saving profile for run {self.run_id}: {e}")
+            return None
+        logger.info(f"Saved profile {name}: wall={summary['wall_seconds']:.1f}s "
+                    f"cpu={summary['process_cpu_seconds']:.1f}s samples={self.sampler.samples}")
+        prune_profiles(self.directory, self.max_kept)
+        return name
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> List[Dict[str, Any]]:
+    """
+    Returns the saved profile artifacts, newest first.
+    """
+    if not os.path.isdir(directory):
+        return []
+    artifacts = [
+        {"filename": entry.name, "size": entry.stat().st_size, "modified": entry.stat().st_mtime}
+        for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.endswith((".folded", ".json"))
+    ]
+    return sorted(artifacts, key=lambda a: a["modified"], reverse=True)
+
+
+def prune_profiles(directory: str = PROFILE_DIR, max_kept: int = PROFILE_MAX_KEPT) -> int:
+    """
+    Deletes the artifacts of all but the `max_kept` most recent profiles.
+
+    Returns:
+        int: Number of files deleted
+    """
+    kept, deleted = set(), 0
+    for artifact in list_profiles(directory):
+        name = os.path.splitext(artifact["filename"])[0]
+        if name in kept or len(kept) < max_kept:
+            kept.add(name)
+            continue
+        try:
+            os.remove(os.path.join(directory, artifact["filename"]))
+            deleted += 1
+        except FileNotFoundError:  # Pruned concurrently by another worker
+            pass
+    return deleted
@@ -0,0 +1,284 @@
+"""
+Sampled local tracing of research runs.
+
+A sampled run gets a callback handler that turns graph nodes, LLM calls and tools into
+spans. Spans go into a bounded in-memory buffer (dropped, never blocking, when it is
+full) and a background thread writes them in batches to a local JSONL or SQLite file,
+so traces can be inspected offline without any external service.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.config import (
+    TRACE_EXPORTER, TRACE_SAMPLE_RATE, TRACE_SINK, TRACE_DIR, TRACE_BUFFER_SIZE,
+    TRACE_BATCH_SIZE, TRACE_FLUSH_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlSink:
+    """
+    Appends spans to a JSON Lines file, one per process ("traces.jsonl" is written as
+    "traces.<pid>.jsonl"), so gunicorn workers never interleave their lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def process_path(self) -> str:
+        # Resolved on every write: workers forked after the sink was created get their own file
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{os.getpid()}{ext}"
+
+    def write(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.process_path(), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(span, default=str) + "\n" for span in spans))
+
+
+class SqliteSink:
+    """
+    Inserts spans into a SQLite table (one connection, used only by the exporter thread).
+    """
+
+    COLUMNS = ["trace_id", "span_id", "parent_id", "name", "type", "node", "start_time",
+               "duration_ms", "error", "input_tokens", "output_tokens"]
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS spans (trace_id TEXT, span_id TEXT, parent_id TEXT, name TEXT, "
+                "type TEXT, node TEXT, start_time REAL, duration_ms REAL, error TEXT, "
+                "input_tokens INTEGER, output_tokens INTEGER)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS spans_trace ON spans (trace_id)")
+        return self._connection
+
+    def write(self, spans: List[Dict[str, Any]]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                f"INSERT INTO spans VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                [tuple(span.get(column) for column in self.COLUMNS) for span in spans])
+
+
+class BatchExporter:
+    """
+    Bounded span buffer drained in batches by a background thread.
+    """
+
+    def __init__(self, sink, buffer_size: int = TRACE_BUFFER_SIZE, batch_size: int = TRACE_BATCH_SIZE,
+                 flush_interval: float = TRACE_FLUSH_INTERVAL_SECONDS):
+        """
+        Initializes the exporter.
+
+        Args:
+            sink: Object with a `write(spans)` method
+            buffer_size: Maximum number of spans waiting to be written
+            batch_size: Maximum number of spans per write
+            flush_interval: Maximum seconds a span waits before being written
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def submit(self, span: Dict[str, Any]) -> None:
+        """
+        Queues a span for export without blocking; the span is dropped if the buffer is full.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first: Dict[str, Any]) -> List[Dict[str, Any]]:
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.sink.write(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Failed to export {len(batch)} spans: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self) -> None:
+        while True:
+            self._write(self._drain(self._queue.get()))
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """
+        Waits until every queued span has been written (or the timeout expires).
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self) -> Dict[str, int]:
+        return {"exported": self.exported, "dropped": self.dropped, "failed": self.failed,
+                "queued": self._queue.qsize()}
+
+
+class TraceSpanHandler(BaseCallbackHandler):
+    """
+    Callback handler turning one run's nodes, LLM, tool and retriever calls into spans.
+    """
+
+    def __init__(self, trace_id: str, exporter: BatchExporter):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, span_type: str,
+               metadata: Optional[Dict[str, Any]]) -> None:
+        self._open[run_id] = {
+            "trace_id": self.trace_id,
+            "span_id": str(run_id),
+            "parent_id": str(parent_run_id) if parent_run_id else None,
+            "name": name,
+            "type": span_type,
+            "node": (metadata or {}).get("langgraph_node"),
+            "start_time": time.time(),
+        }
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **extra: Any) -> None:
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return
+        span["duration_ms"] = (time.time() - span["start_time"]) * 1000
+        span["error"] = repr(error) if error is not None else None
+        span.update(extra)
+        self.exporter.submit(span)
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name", "chain")
+        # Only the run's root and the graph nodes themselves, not LangGraph's internal runnables
+        if parent_run_id is None or name == (metadata or {}).get("langgraph_node"):
+            self._start(run_id, parent_run_id, name, "chain", metadata)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, kwargs.get("name") or "chat_model", "llm", metadata)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                     **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, kwargs.get("name") or "llm", "llm", metadata)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = {}
+        try:
+            usage = response.generations[0][0].message.usage_metadata or {}
+        except (AttributeError, IndexError):
+            pass
+        self._end(run_id, input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                      **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, kwargs.get("name") or (serialized or {}).get("name", "tool"),
+                    "tool", metadata)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+
+class Tracer:
+    """
+    Decides which runs are traced and hands out their callback handlers.
+    """
+
+    def __init__(self, exporter: Optional[BatchExporter], sample_rate: float = TRACE_SAMPLE_RATE):
+        """
+        Initializes the tracer.
+
+        Args:
+            exporter: Exporter receiving the spans, or None to disable local tracing
+            sample_rate: Fraction of runs traced (0 to 1)
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def callbacks_for_run(self, trace_id: str) -> list:
+        """
+        Returns the callback handlers for a run: a span handler if the run is sampled, otherwise none.
+        """
+        if self.exporter is None or self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return []
+        return [TraceSpanHandler(trace_id, self.exporter)]
+
+
+def create_tracer(exporter_name: str = TRACE_EXPORTER, sink_name: str = TRACE_SINK,
+                  directory: str = TRACE_DIR, sample_rate: float = TRACE_SAMPLE_RATE) -> Tracer:
+    """
+    Builds the tracer described by the tracing settings.
+    """
+    if exporter_name != "local":
+        return Tracer(None, 0.0)
+    if sink_name == "sqlite":
+        sink = SqliteSink(os.path.join(directory, "traces.sqlite"))
+    else:
+        sink = JsonlSink(os.path.join(directory, "traces.jsonl"))
+    return Tracer(BatchExporter(sink), sample_rate)
+
+
+# Process-wide tracer
+tracer = create_tracer()
@@ -0,0 +1,13 @@
+"""
+Shared test setup: offline settings, and the project root on the import path.
+"""
+import os
+import sys
+
+# Set before importing the application, whose modules read them at import time
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ["TRACE_EXPORTER"] = "off"
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
@@ -0,0 +1,91 @@
+"""
+Tests for the citation consolidation helpers.
+"""
+from src.utils.citations import (
+    CitationRegistry, consolidate_sections, finalize_citations, format_sources, rewrite_markers, split_sources
+)
+
+PETR4 = """## PETR4: Outlook
+Brent prices support cash flow [1]. Analysts see upside [2], [1, 2].
+
+### Sources
+[1] https://example.com/brent
+[2] https://example.com/petr4-targets
+"""
+
+VALE3 = """## VALE3: Outlook
+Iron ore demand is soft [1]. Brent also weighs on freight costs [2].
+
+### Sources
+1. [1] https://example.com/iron-ore
+2. [2] https://example.com/brent/
+"""
+
+
+def test_split_sources_separates_body_and_numbered_list():
+    body, sources = split_sources(PETR4)
+    assert body.endswith("[2], [1, 2].")
+    assert "Sources" not in body
+    assert sources == {1: "https://example.com/brent", 2: "https://example.com/petr4-targets"}
+
+
+def test_sections_are_renumbered_against_one_global_list():
+    bodies, sources = consolidate_sections([PETR4, VALE3])
+    assert sources == [
+        "https://example.com/brent",
+        "https://example.com/petr4-targets",
+        "https://example.com/iron-ore",
+    ]
+    assert "Analysts see upside [2], [1][2]." in bodies[0]
+    # VALE3's [1] is a new source, its [2] the same Brent URL as PETR4's [1]
+    assert "Iron ore demand is soft [3]. Brent also weighs on freight costs [1]." in bodies[1]
+
+
+def test_duplicate_sources_get_one_number():
+    registry = CitationRegistry()
+    first = registry.number_for("Reuters: https://example.com/news/1.")
+    assert registry.number_for("https://EXAMPLE.com/news/1/") == first
+    assert registry.number_for("Company filing") != first
+    assert registry.number_for("company filing ") == 2
+    assert registry.sources == ["Reuters: https://example.com/news/1.", "Company filing"]
+
+
+def test_repeated_numbers_in_a_marker_are_collapsed():
+    assert rewrite_markers("Growth [1, 2, 1].", {1: 5, 2: 5}) == "Growth [5]."
+
+
+def test_unmapped_markers_and_links_are_left_unchanged():
+    text = "Targets for [2024] and [2025, 2026] rose [1]; see [the filing](https://example.com) [3]."
+    assert rewrite_markers(text, {1: 4}) == \
+        "Targets for [2024] and [2025, 2026] rose [4]; see [the filing](https://example.com) [3]."
+
+
+def test_finalize_keeps_cited_sources_in_order_of_appearance():
+    sources = ["https://a", "https://b", "https://c"]
+    text, cited = finalize_citations("Intro [3].\n\nBody [1][3], guidance for [2024].", sources)
+    assert text == "Intro [1].\n\nBody [2][1], guidance for [2024]."
+    assert cited == ["https://c", "https://a"]
+    assert format_sources(cited) == "[1] https://c\n[2] https://a"
+    assert format_sources([]) is None
+
+
+def test_markers_without_a_listed_source_are_dropped():
+    petr4 = "## PETR4\nBrent helps [1]. Guidance cut [3]. Capex plan for [2026], [2, 4].\n\n### Sources\n[1] https://a.com\n[2] https://b.com"
+    vale3 = "## VALE3\nIron ore [1]. Freight [2]. Costs [3].\n\n### Sources\n[1] https://x.com\n[2] https://y.com\n[3] https://c.com"
+    bodies, sources = consolidate_sections([petr4, vale3])
+    assert bodies[0] == "## PETR4\nBrent helps [1]. Guidance cut. Capex plan for [2026], [2]."
+    text, cited = finalize_citations(bodies[0], sources)
+    assert "https://c.com" not in cited
+    # Sections without a source list keep their markers as they are
+    assert consolidate_sections(["## ITUB4\nMargins [1]."])[0] == ["## ITUB4\nMargins [1]."]
+
+
+def test_bold_and_plain_sources_labels_are_recognized():
+    for label in ("**Sources:**", "**Sources**:", "Sources:", "__Sources__"):
+        body, sources = split_sources(f"## VALE3\nIron ore [1].\n\n{label}\n[1] https://example.com/iron-ore")
+        assert body == "## VALE3\nIron ore [1]."
+        assert sources == {1: "https://example.com/iron-ore"}
+
+    bodies, sources = consolidate_sections([PETR4, "## ITUB4\nCredit [1].\n\n**Sources:**\n- [1] https://example.com/credit"])
+    assert bodies[1] == "## ITUB4\nCredit [3]."
+    assert sources[2] == "https://example.com/credit"
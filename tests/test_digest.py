@@ -0,0 +1,60 @@
+"""
+Tests for the incremental digest of report sections.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.digest import DigestRegistry, RunDigest
+
+
+def test_parallel_writers_share_one_snapshot_while_merges_run():
+    release = threading.Event()
+
+    def slow_merge(texts):
+        release.wait(5)
+        return "merged"
+
+    digest = RunDigest(slow_merge, ThreadPoolExecutor(max_workers=1), fan_in=2)
+    sections = [(f"ref{i}", f"## Section {i}\nBody [1].\n\n### Sources\n[1] https://example.com/{i}")
+                for i in range(3)]
+    digest.add(*sections[0])
+    digest.add(*sections[1])
+
+    # Writers waiting for the running merge, while a straggler section arrives
+    results = []
+    def writer():
+        results.append(digest.snapshot(sections, wait=0.3))
+    writers = [threading.Thread(target=writer) for _ in range(3)]
+    for thread in writers:
+        thread.start()
+    digest.add("late", "## Late\nLate body [1].\n\n### Sources\n[1] https://example.com/late")
+    for thread in writers:
+        thread.join()
+    release.set()
+
+    assert len(results) == 3
+    assert all(snapshot is results[0] for snapshot in results)
+    assert len(results[0].bodies) == 3
+
+
+def test_discarding_a_run_skips_its_queued_merges():
+    release = threading.Event()
+    merged = []
+
+    def merge(texts):
+        release.wait(5)
+        merged.append(texts)
+        return "merged"
+
+    registry = DigestRegistry(max_workers=1)
+    digest = registry.start("run", merge, fan_in=2)
+    for i in range(6):
+        digest.add(f"ref{i}", f"## Section {i}")
+
+    # One merge is running, two are queued behind it
+    registry.discard("run")
+    release.set()
+    registry._executor.shutdown(wait=True)
+
+    assert len(merged) <= 1
+    assert registry.get("run") is None
@@ -0,0 +1,154 @@
+"""
+Tests for the pre-warm scheduler and section store, driven by a fake clock.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from langgraph.types import Send
+
+from src.core import prewarm
+from src.core.prewarm import GEOPOLITICAL_KEY, PrewarmScheduler, SectionStore, prewarm_sections
+from src.core.state import Analyst
+from src.utils.blobs import blob_store
+
+BRT = timezone(timedelta(hours=-3))
+
+
+class FakeClock:
+    def __init__(self, when: datetime):
+        self.now = when.timestamp()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, **delta) -> None:
+        self.now += timedelta(**delta).total_seconds()
+
+
+class RecordingRunner:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, store, max_concurrency):
+        self.calls.append((list(tickers), max_concurrency))
+        for ticker in tickers:
+            store.save(ticker, f"## {ticker}")
+        return len(tickers)
+
+
+def make_scheduler(tmp_path, clock, watchlist=("PETR4", "VALE3"), **kwargs):
+    runner = RecordingRunner()
+    store = SectionStore(str(tmp_path / "sections"), ttl_seconds=8 * 3600, clock=clock)
+    scheduler = PrewarmScheduler(watchlist=list(watchlist), run_at="07:00", utc_offset_hours=-3,
+                                 store=store, clock=clock, runner=runner, **kwargs)
+    return scheduler, runner
+
+
+def test_daily_trigger_runs_once_per_day_at_the_configured_time(tmp_path):
+    clock = FakeClock(datetime(2026, 3, 2, 6, 0, tzinfo=BRT))
+    scheduler, runner = make_scheduler(tmp_path, clock)
+
+    assert scheduler.seconds_until_next_run() == 3600
+    assert not scheduler.tick()
+
+    clock.advance(hours=1)
+    assert scheduler.tick()
+    assert runner.calls == [(["PETR4", "VALE3"], scheduler.max_concurrency)]
+
+    # Not again the same day
+    clock.advance(hours=2)
+    assert not scheduler.tick()
+    assert scheduler.seconds_until_next_run() == 22 * 3600
+
+    # Next morning, once the sections have expired
+    clock.advance(hours=22)
+    assert scheduler.tick()
+    assert len(runner.calls) == 2
+
+
+def test_daily_budget_counts_the_geopolitical_interview_and_resets_each_day(tmp_path):
+    clock = FakeClock(datetime(2026, 3, 2, 7, 0, tzinfo=BRT))
+    scheduler, runner = make_scheduler(tmp_path, clock, watchlist=["A", "B", "C", "D", "E"], daily_budget=4)
+
+    # 4 interviews: 3 tickers plus the geopolitical one
+    assert scheduler.run_once() == 3
+    assert runner.calls[-1][0] == ["A", "B", "C"]
+    assert scheduler.remaining_budget() == 0
+
+    assert scheduler.run_once() == 0
+    assert len(runner.calls) == 1
+
+    # Yesterday's sections have expired by then
+    clock.advance(days=1)
+    assert scheduler.remaining_budget() == 4
+    assert scheduler.run_once() == 3
+    assert runner.calls[-1][0] == ["A", "B", "C"]
+
+
+def test_only_stale_sections_are_refreshed(tmp_path):
+    clock = FakeClock(datetime(2026, 3, 2, 7, 0, tzinfo=BRT))
+    scheduler, runner = make_scheduler(tmp_path, clock)
+    scheduler.store.save("PETR4", "## PETR4")
+
+    assert scheduler.run_once() == 1
+    assert runner.calls == [(["VALE3"], scheduler.max_concurrency)]
+    assert scheduler.run_once() == 0
+
+
+def test_sections_expire_after_their_ttl(tmp_path):
+    clock = FakeClock(datetime(2026, 3, 2, 7, 0, tzinfo=BRT))
+    store = SectionStore(str(tmp_path / "sections"), ttl_seconds=3600, clock=clock)
+    store.save("PETR4", "## PETR4")
+
+    clock.advance(minutes=59)
+    assert store.get_fresh("PETR4") == "## PETR4"
+    assert store.lookup(["PETR4", "VALE3"]) == {"PETR4": "## PETR4"}
+
+    clock.advance(minutes=2)
+    assert store.get_fresh("PETR4") is None
+    assert store.lookup(["PETR4"]) == {}
+
+
+def test_section_store_creates_its_directory_on_first_write(tmp_path):
+    directory = tmp_path / "sections"
+    store = SectionStore(str(directory))
+    assert not directory.exists()
+    assert store.get_fresh("PETR4") is None
+
+    store.save("PETR4", "## PETR4")
+    assert directory.is_dir()
+
+
+def test_prewarm_sections_bounds_concurrent_interviews(tmp_path, monkeypatch):
+    tickers = ["PETR4", "VALE3", "ITUB4", "BBDC4", "ABEV3"]
+    analysts = [Analyst(affiliation="Bank", name=f"Analyst {t}", role="Equity Analyst", description=f"Covers {t}")
+                for t in tickers]
+    analysts.append(Analyst(affiliation="Bank", name="Geo", role="Geopolitical Analyst", description="Macro"))
+
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    class FakeInterviewGraph:
+        def invoke(self, interview_input):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            section = f"## {interview_input['analyst'].name}"
+            return {"sections": [blob_store.put(section, interview_input["run_id"])]}
+
+    monkeypatch.setattr(prewarm, "create_analysts", lambda state: {"analysts": analysts})
+    monkeypatch.setattr(prewarm, "start_all_interviews", lambda state: [
+        Send("conduct_interview", {"analyst": a, "run_id": state["run_id"]}) for a in state["analysts"]])
+    monkeypatch.setattr(prewarm, "create_interview_graph", FakeInterviewGraph)
+
+    store = SectionStore(str(tmp_path / "sections"))
+    assert prewarm_sections(tickers, store, max_concurrency=2) == 6
+    assert peak[0] == 2
+    assert store.get_fresh("ITUB4") == "## Analyst ITUB4"
+    assert store.get_fresh(GEOPOLITICAL_KEY) == "## Geo"
+    # The run's payloads are released once the sections are stored
+    assert blob_store.stats()["runs"] == 0
@@ -0,0 +1,20 @@
+"""
+Tests for the retention of saved run profiles.
+"""
+import os
+
+from src.utils.profiling import list_profiles, prune_profiles
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    for i in range(5):
+        for suffix in (".folded", ".json"):
+            path = tmp_path / f"profile_{i}{suffix}"
+            path.write_text("data")
+            os.utime(path, (1000 + i, 1000 + i))
+    (tmp_path / "notes.txt").write_text("not a profile")
+
+    assert prune_profiles(str(tmp_path), max_kept=2) == 6
+    assert sorted(a["filename"] for a in list_profiles(str(tmp_path))) == [
+        "profile_3.folded", "profile_3.json", "profile_4.folded", "profile_4.json"]
+    assert (tmp_path / "notes.txt").exists()